@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .async_views import (ingredient_list, recipe_detail, redirect_short_link,
+                          tag_list)
+
+urlpatterns = [
+    path('s/<str:code>/', redirect_short_link, name='short-link-redirect'),
+    path('api/tags/', tag_list),
+    path('api/ingredients/', ingredient_list),
+    path('api/recipes/<int:pk>/', recipe_detail),
+]
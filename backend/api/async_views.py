@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from foodgram_backend.metrics import instrument_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .views import (IngredientViewset, RecipeViewset, TagViewset,
+                    short_link_response, short_link_target)
+
+# Отдельный пул вместо общего потока thread_sensitive: медленные запросы
+# к базе не выстраиваются в очередь за одним потоком.
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_WORKERS,
+    thread_name_prefix='async-db',
+)
+
+
+def with_connections(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        instrument_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def in_pool(func):
+    return sync_to_async(with_connections(func), thread_sensitive=False,
+                         executor=executor)
+
+
+def pooled_view(view):
+    async def async_view(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        return await in_pool(view)(request, *args, **kwargs)
+    # Декораторы Django 3.2 не поддерживают async-представления.
+    async_view.csrf_exempt = True
+    return async_view
+
+
+async def redirect_short_link(request, code):
+    return short_link_response(await in_pool(short_link_target)(code))
+
+
+tag_list = pooled_view(TagViewset.as_view({'get': 'list'}))
+ingredient_list = pooled_view(IngredientViewset.as_view({'get': 'list'}))
+recipe_detail = pooled_view(RecipeViewset.as_view({
+    'get': 'retrieve',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
@@ -0,0 +1,130 @@
+import json
+import logging
+from itertools import islice
+from uuid import uuid4
+
+from django.db import connection, transaction
+from recipes.constants import IMPORT_BATCH_SIZE, SHORT_CODE_MAX_LENGTH
+from recipes.feed import schedule_fan_out
+from recipes.images import schedule_variants
+from recipes.models import (Ingredient, MediaFile, Recipe, RecipeIngredient,
+                            Tag, short_link_codec, update_counter)
+from users.models import UserModel
+
+from .serializers import RecipeImportSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lines(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError:
+            yield number, None, {
+                'non_field_errors': ['Строка не является объектом JSON.']}
+
+
+def import_recipes(lines, author, batch_size=IMPORT_BATCH_SIZE):
+    rows = parse_lines(lines)
+    line = 1
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            line = batch[0][0]
+            yield from import_batch(batch, author)
+            line = batch[-1][0] + 1
+    except Exception:
+        # Статус 200 уже отправлен: вместо оборванного тела поток
+        # заканчивается явной записью об ошибке. Пачка откатывается целиком.
+        logger.exception('Импорт рецептов прерван на строке %s', line)
+        yield {'line': line, 'error': (
+            'Импорт прерван внутренней ошибкой: эта и следующие строки'
+            ' не импортированы.')}
+
+
+def import_batch(batch, author):
+    results = {}
+    valid = []
+    for number, data, errors in batch:
+        if errors is None:
+            serializer = RecipeImportSerializer(data=data)
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+                continue
+            errors = serializer.errors
+        results[number] = {'line': number, 'errors': errors}
+
+    tag_ids = set(Tag.objects.filter(pk__in={
+        tag_id for _, data in valid for tag_id in data['tags']
+    }).order_by().values_list('pk', flat=True))
+    ingredient_ids = set(Ingredient.objects.filter(pk__in={
+        item['id'] for _, data in valid for item in data['ingredients']
+    }).order_by().values_list('pk', flat=True))
+
+    recipes = []
+    for number, data in valid:
+        errors = {}
+        missing_tags = [pk for pk in data['tags'] if pk not in tag_ids]
+        if missing_tags:
+            errors['tags'] = [f'Тэги не найдены: {missing_tags}.']
+        missing_ingredients = [item['id'] for item in data['ingredients']
+                               if item['id'] not in ingredient_ids]
+        if missing_ingredients:
+            errors['ingredients'] = [
+                f'Ингредиенты не найдены: {missing_ingredients}.']
+        if errors:
+            results[number] = {'line': number, 'errors': errors}
+            continue
+        recipes.append((number, data, Recipe(
+            author=author, name=data['name'], text=data['text'],
+            cooking_time=data['cooking_time'], image=data['image'])))
+
+    if recipes:
+        with transaction.atomic():
+            insert_recipes(recipes, author)
+        for number, _, recipe in recipes:
+            results[number] = {'line': number, 'id': recipe.pk}
+    return [results[number] for number, _, _ in batch]
+
+
+def insert_recipes(recipes, author):
+    objs = [recipe for _, _, recipe in recipes]
+    returns_pks = connection.features.can_return_rows_from_bulk_insert
+    if not returns_pks:
+        # SQLite в Django 3.2 не возвращает ключи из bulk_create: строки
+        # находятся по временному уникальному коду. Дефиса в кодах Sqids
+        # нет, поэтому с настоящими кодами он не совпадёт.
+        for recipe in objs:
+            recipe.short_code = (
+                f'-{uuid4().hex[:SHORT_CODE_MAX_LENGTH - 1]}')
+    Recipe.objects.bulk_create(objs)
+    if not returns_pks:
+        pks = dict(Recipe.objects.filter(short_code__in=[
+            recipe.short_code for recipe in objs
+        ]).values_list('short_code', 'pk'))
+        for recipe in objs:
+            recipe.pk = pks[recipe.short_code]
+
+    # Сигналы при bulk_create не вызываются: повторяем их работу пачкой.
+    for recipe in objs:
+        recipe.short_code = short_link_codec.encode([recipe.pk])
+    Recipe.objects.bulk_update(objs, ['short_code'])
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+        for _, data, recipe in recipes for tag_id in data['tags']
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe_id=recipe.pk, ingredient_id=item['id'],
+                         amount=item['amount'])
+        for _, data, recipe in recipes for item in data['ingredients']
+    )
+    MediaFile.objects.acquire_many(recipe.image.name for recipe in objs)
+    update_counter(UserModel, author.pk, 'recipes_count', len(objs))
+    for recipe in objs:
+        schedule_variants(recipe.image)
+        schedule_fan_out(recipe)
@@ -0,0 +1,138 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    # Без параметра cursor работает как обычная постраничная пагинация.
+    cursor_query_param = 'cursor'
+    cursor_page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-datetime_created', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Курсор годится только для запроса, упорядоченного по ключу: с
+        # сортировкой по релевантности поиска или по другим полям отвечаем
+        # обычными страницами.
+        self.cursor_mode = (self.cursor_query_param in request.query_params
+                            and self.follows_ordering(queryset))
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_cursor_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+        queryset = self.after_position(queryset, position)
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = [
+                getattr(page[-1], field.lstrip('-'))
+                for field in self.ordering
+            ]
+        return page
+
+    def follows_ordering(self, queryset):
+        order = tuple(queryset.query.order_by)
+        return order == self.ordering[:len(order)]
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'results': data,
+        })
+
+    def get_cursor_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(
+                self.cursor_page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def after_position(self, queryset, position):
+        if position is None:
+            return queryset
+        try:
+            return queryset.filter(self.after(position))
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound('Неверный курсор.')
+
+    def after(self, position):
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value for previous, value
+                in zip(self.ordering[:index], position)
+            }
+            conditions.append(Q(**equal, **{
+                f'{name}__{lookup}': position[index]}))
+        return reduce(or_, conditions)
+
+    def encode_cursor(self, position):
+        # isoformat без округления: ключ должен совпадать с точностью до мкс.
+        return urlsafe_b64encode(json.dumps(
+            position, default=lambda value: value.isoformat()
+        ).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise NotFound('Неверный курсор.')
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound('Неверный курсор.')
+        return position
+
+    def get_next_cursor_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_position))
+
+
+class SubscriptionPagination(KeysetPagination):
+    ordering = ('username', 'id')
+
+
+class FeedPagination(KeysetPagination):
+    ordering = ('-datetime_created', '-recipe_id')
+
+    def paginate_sources(self, sources, request):
+        # Лента собирается из нескольких источников с общим ключом.
+        self.cursor_mode = True
+        self.request = request
+        page_size = self.get_cursor_page_size(request)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, ''))
+        fields = [field.lstrip('-') for field in self.ordering]
+        rows = set()
+        for queryset in sources:
+            queryset = self.after_position(
+                queryset.order_by(*self.ordering), position)
+            rows.update(queryset.values_list(*fields)[:page_size + 1])
+        rows = sorted(rows, reverse=True)
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = list(rows[-1])
+        return [recipe_id for _, recipe_id in rows]
@@ -0,0 +1,358 @@
+import struct
+import zlib
+from functools import lru_cache
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+PAGE_MARGIN = 50
+FONT_SIZE = 12
+LINE_HEIGHT = 18
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * PAGE_MARGIN) // LINE_HEIGHT
+# Ширина строки в тысячных долях кегля, в которых заданы ширины глифов.
+LINE_WIDTH = (PAGE_WIDTH - 2 * PAGE_MARGIN) * 1000 // FONT_SIZE
+
+CATALOG, PAGES, FONT, CID_FONT, DESCRIPTOR, FONT_FILE, TO_UNICODE = range(
+    1, 8)
+FIRST_PAGE_OBJECT = 8
+
+# Таблицы, без которых шрифт CIDFontType2 не отрисовать.
+SUBSET_TABLES = {'cmap', 'cvt ', 'fpgm', 'glyf', 'head', 'hhea', 'hmtx',
+                 'loca', 'maxp', 'prep'}
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+class TrueTypeFont:
+    def __init__(self, path):
+        with open(path, 'rb') as font_file:
+            self.data = font_file.read()
+        self.tables = {}
+        self.lengths = {}
+        num_tables = struct.unpack_from('>H', self.data, 4)[0]
+        for index in range(num_tables):
+            tag, _, offset, length = struct.unpack_from(
+                '>4sIII', self.data, 12 + index * 16)
+            self.tables[tag.decode('latin-1')] = offset
+            self.lengths[tag.decode('latin-1')] = length
+
+        head = self.tables['head']
+        self.units_per_em = struct.unpack_from('>H', self.data, head + 18)[0]
+        self.long_loca = struct.unpack_from('>h', self.data, head + 50)[0]
+        self.num_glyphs = struct.unpack_from(
+            '>H', self.data, self.tables['maxp'] + 4)[0]
+        self.bbox = [
+            self.scale(value)
+            for value in struct.unpack_from('>4h', self.data, head + 36)
+        ]
+        hhea = self.tables['hhea']
+        ascent, descent = struct.unpack_from('>hh', self.data, hhea + 4)
+        self.ascent = self.scale(ascent)
+        self.descent = self.scale(descent)
+        num_metrics = struct.unpack_from('>H', self.data, hhea + 34)[0]
+        self.widths = [
+            self.scale(struct.unpack_from(
+                '>H', self.data, self.tables['hmtx'] + index * 4)[0])
+            for index in range(num_metrics)
+        ]
+        self.glyphs = self.read_cmap()
+
+    def scale(self, value):
+        return round(value * 1000 / self.units_per_em)
+
+    def read_cmap(self):
+        cmap = self.tables['cmap']
+        num_tables = struct.unpack_from('>H', self.data, cmap + 2)[0]
+        for index in range(num_tables):
+            platform, encoding, offset = struct.unpack_from(
+                '>HHI', self.data, cmap + 4 + index * 8)
+            subtable = cmap + offset
+            if ((platform, encoding) == (3, 1)
+                    and struct.unpack_from('>H', self.data, subtable)[0] == 4):
+                return self.read_cmap_format_4(subtable)
+        raise ValueError('В шрифте нет юникодной таблицы cmap.')
+
+    def read_cmap_format_4(self, subtable):
+        seg_count = struct.unpack_from('>H', self.data, subtable + 6)[0] // 2
+        end_codes = subtable + 14
+        start_codes = end_codes + seg_count * 2 + 2
+        deltas = start_codes + seg_count * 2
+        range_offsets = deltas + seg_count * 2
+        glyphs = {}
+        for segment in range(seg_count):
+            end = struct.unpack_from(
+                '>H', self.data, end_codes + segment * 2)[0]
+            start = struct.unpack_from(
+                '>H', self.data, start_codes + segment * 2)[0]
+            delta = struct.unpack_from(
+                '>h', self.data, deltas + segment * 2)[0]
+            range_offset_position = range_offsets + segment * 2
+            range_offset = struct.unpack_from(
+                '>H', self.data, range_offset_position)[0]
+            for code in range(start, min(end, 0xFFFE) + 1):
+                if range_offset == 0:
+                    glyph = (code + delta) & 0xFFFF
+                else:
+                    glyph = struct.unpack_from(
+                        '>H', self.data,
+                        range_offset_position + range_offset
+                        + (code - start) * 2)[0]
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                if glyph:
+                    glyphs[chr(code)] = glyph
+        return glyphs
+
+    def width(self, glyph):
+        return self.widths[min(glyph, len(self.widths) - 1)]
+
+    def text_width(self, text):
+        return sum(self.width(self.glyphs.get(char, 0)) for char in text)
+
+    def table(self, tag):
+        offset = self.tables[tag]
+        return self.data[offset:offset + self.lengths[tag]]
+
+    def glyph_data(self, glyph):
+        loca = self.tables['loca']
+        if self.long_loca:
+            start, end = struct.unpack_from('>II', self.data, loca + glyph * 4)
+        else:
+            start, end = (2 * value for value in struct.unpack_from(
+                '>HH', self.data, loca + glyph * 2))
+        glyf = self.tables['glyf']
+        return self.data[glyf + start:glyf + end]
+
+    def components(self, glyph):
+        data = self.glyph_data(glyph)
+        if not data or struct.unpack_from('>h', data)[0] >= 0:
+            return
+        position = 10
+        while True:
+            flags, component = struct.unpack_from('>HH', data, position)
+            yield component
+            position += 8 if flags & ARG_1_AND_2_ARE_WORDS else 6
+            if flags & WE_HAVE_A_SCALE:
+                position += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                position += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                position += 8
+            if not flags & MORE_COMPONENTS:
+                return
+
+    def subset(self, glyphs):
+        # Номера глифов сохраняются (CIDToGIDMap /Identity), из glyf
+        # удаляются контуры всех глифов, кроме использованных и их частей.
+        keep = set()
+        pending = [0, *glyphs]
+        while pending:
+            glyph = pending.pop()
+            if glyph not in keep and glyph < self.num_glyphs:
+                keep.add(glyph)
+                pending.extend(self.components(glyph))
+        glyf = bytearray()
+        offsets = []
+        for glyph in range(self.num_glyphs):
+            offsets.append(len(glyf))
+            if glyph in keep:
+                glyf += self.glyph_data(glyph)
+                glyf += bytes(-len(glyf) % 4)
+        offsets.append(len(glyf))
+
+        tables = {tag: self.table(tag)
+                  for tag in SUBSET_TABLES & set(self.tables)}
+        tables['glyf'] = bytes(glyf)
+        tables['loca'] = struct.pack(f'>{len(offsets)}I', *offsets)
+        head = bytearray(tables['head'])
+        struct.pack_into('>I', head, 8, 0)
+        struct.pack_into('>h', head, 50, 1)
+        tables['head'] = bytes(head)
+        return build_font(tables)
+
+
+def font_checksum(data):
+    data += bytes(-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+
+def build_font(tables):
+    tags = sorted(tables)
+    selector = len(tags).bit_length() - 1
+    search_range = 16 << selector
+    directory = struct.pack('>IHHHH', 0x00010000, len(tags), search_range,
+                            selector, len(tags) * 16 - search_range)
+    body = b''
+    offset = len(directory) + len(tags) * 16
+    for tag in tags:
+        data = tables[tag]
+        if tag == 'head':
+            head = offset + len(body)
+        directory += struct.pack('>4sIII', tag.encode('latin-1'),
+                                 font_checksum(data), offset + len(body),
+                                 len(data))
+        body += data + bytes(-len(data) % 4)
+    font = bytearray(directory + body)
+    struct.pack_into('>I', font, head + 8,
+                     (0xB1B0AFBA - font_checksum(bytes(font))) & 0xFFFFFFFF)
+    return bytes(font)
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    return TrueTypeFont(path)
+
+
+def wrap_line(font, line):
+    # Строки шире страницы переносятся по словам, слишком длинные слова
+    # разбиваются посимвольно.
+    current = ''
+    for word in line.split(' '):
+        candidate = f'{current} {word}' if current else word
+        if font.text_width(candidate) <= LINE_WIDTH:
+            current = candidate
+            continue
+        if current:
+            yield current
+        current = ''
+        for char in word:
+            if current and font.text_width(current + char) > LINE_WIDTH:
+                yield current
+                current = ''
+            current += char
+    yield current
+
+
+def pdf_object(number, body):
+    return b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+
+def pdf_stream(number, data, extra=b''):
+    data = zlib.compress(data)
+    return pdf_object(
+        number,
+        b'<< /Length %d /Filter /FlateDecode %s>>\nstream\n%s\nendstream'
+        % (len(data), extra, data)
+    )
+
+
+def stream_pdf(lines, font_path):
+    font = load_font(font_path)
+    used_glyphs = {}
+    offsets = {}
+    page_objects = []
+    position = 0
+
+    def emit(number, chunk):
+        nonlocal position
+        offsets[number] = position
+        position += len(chunk)
+        return chunk
+
+    def encode(text):
+        glyph_ids = []
+        for char in text:
+            glyph = font.glyphs.get(char, 0)
+            used_glyphs.setdefault(glyph, char)
+            glyph_ids.append(b'%04X' % glyph)
+        return b'<' + b''.join(glyph_ids) + b'>'
+
+    def page(page_lines):
+        number = FIRST_PAGE_OBJECT + len(page_objects) * 2
+        page_objects.append(number)
+        content = b'BT /F1 %d Tf %d TL %d %d Td\n%s\nET' % (
+            FONT_SIZE, LINE_HEIGHT, PAGE_MARGIN,
+            PAGE_HEIGHT - PAGE_MARGIN - FONT_SIZE,
+            b'\n'.join(encode(line) + b' Tj T*' for line in page_lines)
+        )
+        return emit(number, pdf_object(
+            number,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d]'
+            b' /Resources << /Font << /F1 %d 0 R >> >>'
+            b' /Contents %d 0 R >>'
+            % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, FONT, number + 1)
+        )) + emit(number + 1, pdf_stream(number + 1, content))
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(header)
+    yield header
+
+    page_lines = []
+    for line in lines:
+        for piece in wrap_line(font, line):
+            page_lines.append(piece)
+            if len(page_lines) == LINES_PER_PAGE:
+                yield page(page_lines)
+                page_lines = []
+    if page_lines or not page_objects:
+        yield page(page_lines)
+
+    glyphs = sorted(used_glyphs)
+    yield emit(FONT, pdf_object(
+        FONT,
+        b'<< /Type /Font /Subtype /Type0 /BaseFont /Embedded'
+        b' /Encoding /Identity-H /DescendantFonts [%d 0 R]'
+        b' /ToUnicode %d 0 R >>' % (CID_FONT, TO_UNICODE)
+    ))
+    yield emit(CID_FONT, pdf_object(
+        CID_FONT,
+        b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /Embedded'
+        b' /CIDSystemInfo << /Registry (Adobe) /Ordering (Identity)'
+        b' /Supplement 0 >> /FontDescriptor %d 0 R'
+        b' /CIDToGIDMap /Identity /W [%s] >>' % (
+            DESCRIPTOR,
+            b' '.join(b'%d [%d]' % (glyph, font.width(glyph))
+                      for glyph in glyphs)
+        )
+    ))
+    yield emit(DESCRIPTOR, pdf_object(
+        DESCRIPTOR,
+        b'<< /Type /FontDescriptor /FontName /Embedded /Flags 32'
+        b' /FontBBox [%d %d %d %d] /ItalicAngle 0 /Ascent %d /Descent %d'
+        b' /CapHeight %d /StemV 80 /FontFile2 %d 0 R >>' % (
+            *font.bbox, font.ascent, font.descent, font.ascent, FONT_FILE)
+    ))
+    font_data = font.subset(glyphs)
+    yield emit(FONT_FILE, pdf_stream(
+        FONT_FILE, font_data, b'/Length1 %d ' % len(font_data)))
+    yield emit(TO_UNICODE, pdf_stream(TO_UNICODE, to_unicode_cmap(
+        (glyph, used_glyphs[glyph]) for glyph in glyphs)))
+    yield emit(PAGES, pdf_object(
+        PAGES,
+        b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % number for number in page_objects),
+            len(page_objects))
+    ))
+    yield emit(CATALOG, pdf_object(
+        CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES))
+
+    size = max(offsets) + 1
+    yield b'xref\n0 %d\n0000000000 65535 f \n%s' % (
+        size,
+        b''.join(b'%010d 00000 n \n' % offsets[number]
+                 for number in range(1, size))
+    ) + b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        size, CATALOG, position)
+
+
+def to_unicode_cmap(mapping):
+    entries = [
+        b'<%04X> <%s>' % (glyph, char.encode('utf-16-be').hex().encode())
+        for glyph, char in mapping
+    ]
+    blocks = b''.join(
+        b'%d beginbfchar\n%s\nendbfchar\n' % (
+            len(entries[start:start + 100]),
+            b'\n'.join(entries[start:start + 100]))
+        for start in range(0, len(entries), 100)
+    )
+    return (
+        b'/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n'
+        b'/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS)'
+        b' /Supplement 0 >> def\n/CMapName /Adobe-Identity-UCS def\n'
+        b'/CMapType 2 def\n1 begincodespacerange\n<0000> <FFFF>\n'
+        b'endcodespacerange\n%sendcmap\n'
+        b'CMapName currentdict /CMap defineresource pop\nend\nend' % blocks
+    )
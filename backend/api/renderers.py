@@ -0,0 +1,128 @@
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from .pdf import stream_pdf
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class StreamingRenderer(BaseRenderer, ABC):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def content_type(self):
+        if self.charset is None:
+            return self.media_type
+        return f'{self.media_type}; charset={self.charset}'
+
+    @abstractmethod
+    def stream(self, items):
+        pass
+
+
+class ShoppingListRenderer(StreamingRenderer):
+    def line(self, item):
+        return (f'{item["name"]} - {item["amount"]}'
+                f' {item["measurement_unit"]}')
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        for item in items:
+            yield self.line(item) + '\n'
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('name', 'amount', 'measurement_unit')
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header)
+        for item in items:
+            yield writer.writerow([item[field] for field in self.header])
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, items):
+        separator = '['
+        for item in items:
+            yield separator + json.dumps(item, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, items):
+        return stream_pdf(
+            (self.line(item) for item in items),
+            settings.SHOPPING_LIST_PDF_FONT
+        )
+
+
+def shopping_list_renderers():
+    renderers = [
+        TextShoppingListRenderer,
+        CSVShoppingListRenderer,
+        JSONShoppingListRenderer,
+    ]
+    if os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        renderers.append(PDFShoppingListRenderer)
+    return renderers
+
+
+class NDJSONRecipeExportRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def stream(self, items):
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False,
+                             cls=DjangoJSONEncoder) + '\n'
+
+
+class CSVRecipeExportRenderer(StreamingRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('id', 'name', 'text', 'cooking_time', 'datetime_created',
+              'author_id', 'author_username', 'image', 'short_code',
+              'favorites_count', 'in_carts_count', 'tags', 'ingredients')
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header)
+        for item in items:
+            # Вложенные списки пишутся в ячейку как JSON.
+            yield writer.writerow([
+                json.dumps(item[field], ensure_ascii=False)
+                if field in ('tags', 'ingredients') else item[field]
+                for field in self.header
+            ])
+
+
+def recipe_export_renderers():
+    return [NDJSONRecipeExportRenderer, CSVRecipeExportRenderer]
@@ -2,12 +2,15 @@ import base64
 
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer
 from recipes.constants import COOKING_TIME_MIN_VALUE
+from recipes.images import variant_urls
 from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
 from rest_framework import serializers
+from rest_framework.serializers import raise_errors_on_nested_writes
 from users.models import Subscription
 
 User = get_user_model()
@@ -22,20 +25,39 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        urls = variant_urls(value)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {variant: request.build_absolute_uri(url)
+                for variant, url in urls.items()}
+
+
+class ViewerStateFieldMixin:
+    def get_viewer_state(self, obj, name, related_name, **lookup):
+        if hasattr(obj, name):
+            return getattr(obj, name)
+        user = self.context['request'].user
+        return (user.is_authenticated
+                and getattr(user, related_name).filter(**lookup).exists())
+
+
+class UserSerializer(ViewerStateFieldMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(required=False)
+    avatar_variants = ImageVariantsField(source='avatar')
 
     class Meta:
         fields = ('id', 'email', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar', 'avatar_variants',
+                  'recipes_count', 'followers_count')
         model = User
 
     def get_is_subscribed(self, obj):
-
-        return (self.context["request"].user.is_authenticated
-                and self.context['request'].user.followers.filter(
-                    subscribed_to=obj).exists())
+        return self.get_viewer_state(
+            obj, 'is_subscribed', 'followers', subscribed_to=obj)
 
 
 class UserCreateSerializer(UserCreateSerializer):
@@ -104,7 +126,7 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(ViewerStateFieldMixin, serializers.ModelSerializer):
     author = UserSerializer()
     tags = TagSerializer(many=True)
     ingredients = RecipeIngredientSerializer(
@@ -112,23 +134,24 @@ class RecipeSerializer(serializers.ModelSerializer):
         source='recipe_ingredients'
     )
     image = Base64ImageField()
+    image_variants = ImageVariantsField(source='image')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    short_link = serializers.CharField(source='get_short_link',
+                                       read_only=True)
 
     class Meta:
-        fields = '__all__'
+        exclude = ('short_code',)
         read_only_fields = ['__all__', ]
         model = Recipe
 
     def get_is_favorited(self, obj):
-        return (self.context["request"].user.is_authenticated
-                and self.context['request'].user.favorites.filter(
-                    recipe=obj).exists())
+        return self.get_viewer_state(
+            obj, 'is_favorited', 'favorites', recipe=obj)
 
     def get_is_in_shopping_cart(self, obj):
-        return (self.context["request"].user.is_authenticated
-                and self.context['request'].user.shoppingcart.filter(
-                    recipe=obj).exists())
+        return self.get_viewer_state(
+            obj, 'is_in_shopping_cart', 'shoppingcart', recipe=obj)
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -163,6 +186,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
@@ -175,18 +199,29 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
+        raise_errors_on_nested_writes('update', self, validated_data)
 
-        super().update(instance, validated_data)
+        # Правки одного рецепта выполняются по очереди.
+        Recipe.objects.select_for_update().values('pk').get(pk=instance.pk)
 
-        instance.tags.set(tags)
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
 
-        instance.ingredients.clear()
-        self.recipe_ing_bulk_create(ingredients_data, instance)
+        instance.tags.set(tags)
 
-        instance.save()
+        deltas = self.recipe_ing_update(ingredients_data, instance)
+        if any(deltas.values()):
+            ShoppingListItem.objects.change_recipe(instance, deltas)
         return instance
 
     def to_representation(self, instance):
@@ -200,11 +235,77 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 for ing_data in ingredients_data]
         )
 
+    def recipe_ing_update(self, ingredients_data, recipe):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe)
+        }
+        wanted = {ing_data['ingredient'].pk: ing_data['amount']
+                  for ing_data in ingredients_data}
+        # Разница количеств для списков покупок тех, у кого рецепт
+        # в корзине. Удалённые строки вычитают сигналы post_delete,
+        # bulk_create и bulk_update сигналов не вызывают.
+        deltas = {
+            ingredient_id: amount - (
+                current[ingredient_id].amount if ingredient_id in current
+                else 0)
+            for ingredient_id, amount in wanted.items()
+        }
+
+        removed = current.keys() - wanted.keys()
+        added = [RecipeIngredient(ingredient_id=ingredient_id, amount=amount,
+                                  recipe=recipe)
+                 for ingredient_id, amount in wanted.items()
+                 if ingredient_id not in current]
+        changed = []
+        for ingredient_id, amount in wanted.items():
+            if ingredient_id in current and deltas[ingredient_id]:
+                current[ingredient_id].amount = amount
+                changed.append(current[ingredient_id])
+
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        return deltas
+
+
+class RecipeIngredientImportSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    # Теги и ингредиенты проверяются одним запросом на всю пачку.
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = RecipeIngredientImportSerializer(many=True)
+    image = Base64ImageField()
+    cooking_time = serializers.IntegerField(min_value=COOKING_TIME_MIN_VALUE)
+
+    class Meta:
+        fields = ('name', 'text', 'cooking_time', 'image', 'tags',
+                  'ingredients')
+        model = Recipe
+
+    def validate(self, data):
+        if len(data['tags']) != len(set(data['tags'])):
+            raise serializers.ValidationError('Тэги должны быть уникальны.')
+        ingredient_ids = [item['id'] for item in data['ingredients']]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError('Ингредиенты'
+                                              ' должны быть уникальны.')
+        return data
+
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image')
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
         model = Recipe
 
 
@@ -213,19 +314,25 @@ class SubscriptionSerializer(UserSerializer):
 
     class Meta:
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'avatar', 'recipes')
+                  'is_subscribed', 'avatar', 'avatar_variants', 'recipes',
+                  'recipes_count', 'followers_count')
         model = User
 
     def get_recipes(self, obj):
-        recipes_limit = int(self.context['request'].query_params.get(
-            'recipes_limit', '-1'))
-        recipes_to_serialize = obj.recipes.all(
-        )[:recipes_limit if recipes_limit != -1 else None]
+        if hasattr(obj, 'latest_recipes'):
+            recipes_to_serialize = obj.latest_recipes
+        else:
+            recipes_limit = int(self.context['request'].query_params.get(
+                'recipes_limit', '-1'))
+            recipes_to_serialize = obj.recipes.order_by(
+                '-datetime_created', '-id'
+            )[:recipes_limit if recipes_limit != -1 else None]
 
         return ShortRecipeSerializer(
             recipes_to_serialize,
             many=True,
             required=False,
+            context=self.context,
         ).data
 
 
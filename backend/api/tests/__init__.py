@@ -0,0 +1,26 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthenticatedTestCase(TestCase):
+    # Атрибут класса с пользователем, от имени которого идут запросы.
+    client_user = 'viewer'
+
+    @classmethod
+    def create_user(cls, username, **kwargs):
+        return UserModel.objects.create_user(
+            email=f'{username}@foodgram.ru', username=username,
+            password='password', first_name='Имя', last_name='Фамилия',
+            **kwargs)
+
+    def setUp(self):
+        self.client = self.client_for(getattr(self, self.client_user))
+
+    def client_for(self, user):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
@@ -0,0 +1,107 @@
+import json
+import tempfile
+from unittest import mock
+
+from api.tests.test_image_variants import encode_image
+from asgiref.testing import ApplicationCommunicator
+from django.test import TransactionTestCase, override_settings
+from foodgram_backend.handlers import StreamingASGIHandler
+from recipes import images
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
+from rest_framework.authtoken.models import Token
+from users.models import UserModel
+
+
+class StreamingASGITests(TransactionTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=media.name, SNAPSHOT_ROOT=f'{media.name}/snapshots')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Без обёртки TestCase колбэки on_commit выполняются сразу.
+        for name in ('recipes.images.executor',
+                     'recipes.signals.schedule_fan_out'):
+            patcher = mock.patch(name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(images.pending_images.clear)
+        self.user = UserModel.objects.create_user(
+            email='chef@foodgram.ru', username='chef', password='password',
+            first_name='Имя', last_name='Фамилия', is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.tag = Tag.objects.create(name='Обед', slug='lunch')
+        self.salt = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        recipe = Recipe.objects.create(
+            name='Борщ', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=self.user)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=self.salt, amount=5)
+        ShoppingCart.objects.create(owner=self.user, recipe=recipe)
+
+    async def request(self, method, path, query='', body=b'',
+                      content_type='application/json'):
+        communicator = ApplicationCommunicator(StreamingASGIHandler(), {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'root_path': '',
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+                (b'content-type', content_type.encode()),
+                (b'content-length', str(len(body)).encode()),
+            ],
+            'client': ('127.0.0.1', 10000),
+            'server': ('testserver', 80),
+        })
+        await communicator.send_input(
+            {'type': 'http.request', 'body': body})
+        start = await communicator.receive_output(5)
+        content = b''
+        while True:
+            message = await communicator.receive_output(5)
+            content += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await communicator.wait()
+        return start['status'], content.decode()
+
+    async def test_shopping_list_is_streamed(self):
+        status, content = await self.request(
+            'GET', '/api/recipes/download_shopping_cart/')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(content, 'Соль - 5 г\n')
+
+    async def test_export_is_streamed(self):
+        status, content = await self.request(
+            'GET', '/api/recipes/export/', 'format=ndjson')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [json.loads(line)['name'] for line in content.splitlines()],
+            ['Борщ'])
+
+    async def test_bulk_import_is_streamed(self):
+        line = json.dumps({
+            'name': 'Щи', 'text': 'Текст', 'cooking_time': 10,
+            'image': encode_image((20, 20)), 'tags': [self.tag.pk],
+            'ingredients': [{'id': self.salt.pk, 'amount': 5}],
+        })
+
+        status, content = await self.request(
+            'POST', '/api/recipes/bulk/', body=line.encode(),
+            content_type='application/x-ndjson')
+
+        self.assertEqual(status, 200)
+        self.assertIn('id', json.loads(content))
@@ -0,0 +1,96 @@
+import asyncio
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.utils import deprecation
+from recipes import images
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import UserModel
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncViewsTests(TransactionTestCase):
+
+    def setUp(self):
+        snapshots = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshots.cleanup)
+        settings_override = override_settings(SNAPSHOT_ROOT=snapshots.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Без обёртки TestCase колбэки on_commit выполняются сразу, а
+        # варианты картинок ставятся в очередь и при чтении.
+        for name in ('recipes.images.executor',
+                     'recipes.signals.schedule_fan_out'):
+            patcher = mock.patch(name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(images.pending_images.clear)
+        author = UserModel.objects.create(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Имя', last_name='Фамилия')
+        self.tag = Tag.objects.create(name='Обед', slug='lunch')
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        self.recipe = Recipe.objects.create(
+            name='Борщ', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=author)
+        self.recipe.refresh_from_db()
+        self.client = AsyncClient()
+
+    async def test_read_paths_are_served(self):
+        response = await self.client.get(f'/s/{self.recipe.short_code}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], f'/recipes/{self.recipe.id}')
+
+        response = await self.client.get('/api/tags/')
+        self.assertEqual([tag['slug'] for tag in response.json()],
+                         ['lunch'])
+
+        response = await self.client.get('/api/ingredients/',
+                                         {'name': 'сол'})
+        self.assertEqual([item['name'] for item in response.json()],
+                         ['Соль'])
+
+        response = await self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.json()['name'], 'Борщ')
+
+    async def test_unknown_short_link_redirects_home(self):
+        response = await self.client.get('/s/zzzzzz/')
+
+        self.assertEqual(response['Location'], '/')
+
+    async def test_slow_lookups_run_concurrently(self):
+        def slow_target(code):
+            time.sleep(0.2)
+            return 1
+
+        started = time.monotonic()
+        with mock.patch('api.async_views.short_link_target', slow_target):
+            await asyncio.gather(*(self.client.get(f'/s/code{number}/')
+                                   for number in range(4)))
+
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    async def test_async_middleware_hooks_stay_in_event_loop(self):
+        hops = []
+
+        def counted(func, **kwargs):
+            hops.append(func)
+            return sync_to_async(func, **kwargs)
+
+        sync_to_async = deprecation.sync_to_async
+        with mock.patch.object(deprecation, 'sync_to_async', counted):
+            await self.client.get('/api/tags/')
+            self.assertTrue(hops)
+            hops.clear()
+            with override_settings(MIDDLEWARE=settings.ASYNC_MIDDLEWARE):
+                response = await AsyncClient().get('/api/tags/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        # В поток уходят только сессии и сообщения, работающие с базой.
+        self.assertEqual(
+            {type(hook.__self__).__name__ for hook in hops},
+            {'SessionMiddleware', 'MessageMiddleware'})
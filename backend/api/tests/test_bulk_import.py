@@ -0,0 +1,167 @@
+import io
+import json
+import tempfile
+from unittest import mock
+
+from api import bulk
+from api.tests.test_image_variants import encode_image
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from recipes import images
+from recipes.models import Ingredient, MediaFile, Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkImportTests(TestCase):
+    url = '/api/recipes/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = UserModel.objects.create_user(
+            email='chef@foodgram.ru', username='chef', password='password',
+            first_name='Имя', last_name='Фамилия')
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch')
+        cls.salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        cls.image = encode_image((20, 20))
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(images.pending_images.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def recipe(self, name, tags=None, ingredients=None):
+        return json.dumps({
+            'name': name, 'text': 'Текст', 'cooking_time': 10,
+            'image': self.image,
+            'tags': [self.tag.pk] if tags is None else tags,
+            'ingredients': ([{'id': self.salt.pk, 'amount': 5}]
+                            if ingredients is None else ingredients),
+        })
+
+    def post(self, lines):
+        response = self.client.generic(
+            'POST', self.url, '\n'.join(lines).encode(),
+            content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(
+            response.streaming_content).decode().splitlines()]
+
+    def test_results_are_reported_per_line(self):
+        results = self.post([
+            self.recipe('Борщ'),
+            'не json',
+            '',
+            self.recipe('Без тэга', tags=[self.tag.pk + 100]),
+            self.recipe('Дубли', ingredients=[
+                {'id': self.salt.pk, 'amount': 1},
+                {'id': self.salt.pk, 'amount': 2}]),
+            self.recipe('Щи'),
+        ])
+
+        self.assertEqual([result['line'] for result in results],
+                         [1, 2, 4, 5, 6])
+        self.assertEqual([('id' in result) for result in results],
+                         [True, False, False, False, True])
+        self.assertIn('tags', results[2]['errors'])
+        created = Recipe.objects.filter(
+            pk__in=[results[0]['id'], results[4]['id']]).order_by('pk')
+        self.assertEqual([recipe.name for recipe in created], ['Борщ', 'Щи'])
+
+    def test_imported_recipes_are_complete(self):
+        with mock.patch.object(images, 'executor') as executor, \
+                mock.patch('recipes.feed.executor'), \
+                self.captureOnCommitCallbacks(execute=True):
+            results = self.post([self.recipe('Борщ'), self.recipe('Щи')])
+
+        recipe = Recipe.objects.get(pk=results[0]['id'])
+        self.assertTrue(recipe.short_code)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(list(recipe.recipe_ingredients.values_list(
+            'ingredient_id', 'amount')), [(self.salt.pk, 5)])
+        self.assertEqual(
+            MediaFile.objects.get(name=recipe.image.name).references, 2)
+        self.assertEqual(UserModel.objects.get(
+            pk=self.author.pk).recipes_count, 2)
+        # Одна картинка на оба рецепта готовится один раз.
+        executor.submit.assert_called_once_with(
+            images.run_generation, recipe.image.name)
+
+    def test_lookups_do_not_grow_with_batch(self):
+        # Число запросов не зависит от количества строк в пачке.
+        with self.assertNumQueries(12):
+            self.post([self.recipe('Рецепт')])
+        with self.assertNumQueries(12):
+            self.post([self.recipe(f'Рецепт {number}')
+                       for number in range(5)])
+
+    def test_command_imports_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as source:
+            source.write('\n'.join([self.recipe('Борщ'), 'мусор']))
+            source.flush()
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_recipes', source.name,
+                         author='chef@foodgram.ru',
+                         stdout=stdout, stderr=stderr)
+
+        self.assertIn('Импортировано рецептов: 1, с ошибками: 1.',
+                      stdout.getvalue())
+        self.assertIn('Строка 2', stderr.getvalue())
+        self.assertTrue(Recipe.objects.filter(name='Борщ').exists())
+
+    def fail_second_batch(self):
+        insert_recipes = bulk.insert_recipes
+        calls = []
+
+        def insert(recipes, author):
+            calls.append(recipes)
+            if len(calls) > 1:
+                raise DatabaseError('Соединение потеряно')
+            insert_recipes(recipes, author)
+        return mock.patch.object(bulk, 'insert_recipes', insert)
+
+    def test_failure_mid_stream_ends_with_error_record(self):
+        lines = [self.recipe('Борщ').encode(), b'', self.recipe('Щи').encode(),
+                 self.recipe('Уха').encode()]
+
+        with self.fail_second_batch(), \
+                self.assertLogs('api.bulk', 'ERROR'):
+            results = list(bulk.import_recipes(lines, self.author, 1))
+
+        self.assertEqual(len(results), 2)
+        self.assertIn('id', results[0])
+        self.assertEqual(results[1]['line'], 3)
+        self.assertIn('error', results[1])
+        self.assertEqual(
+            list(Recipe.objects.values_list('name', flat=True)), ['Борщ'])
+
+    def test_failure_is_reported_in_response_body(self):
+        with mock.patch.object(bulk, 'insert_recipes',
+                               side_effect=DatabaseError), \
+                self.assertLogs('api.bulk', 'ERROR'):
+            results = self.post([self.recipe('Борщ'), self.recipe('Щи')])
+
+        self.assertEqual([set(result) for result in results],
+                         [{'line', 'error'}])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_command_fails_on_aborted_import(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as source, \
+                mock.patch.object(bulk, 'insert_recipes',
+                                  side_effect=DatabaseError), \
+                self.assertLogs('api.bulk', 'ERROR'):
+            source.write(self.recipe('Борщ'))
+            source.flush()
+            with self.assertRaisesMessage(CommandError, 'Строка 1'):
+                call_command('import_recipes', source.name,
+                             author='chef@foodgram.ru',
+                             stdout=io.StringIO(), stderr=io.StringIO())
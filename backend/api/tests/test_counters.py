@@ -0,0 +1,108 @@
+import io
+
+from api.tests import AuthenticatedTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from recipes.models import Favorites, Recipe, ShoppingCart
+from users.models import Subscription, UserModel
+
+
+class CounterTests(AuthenticatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = cls.create_user('viewer')
+        cls.author = cls.create_user('author')
+        cls.recipe = Recipe.objects.create(
+            name='Борщ', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=cls.author)
+
+    def counters(self, instance, *fields):
+        return type(instance).objects.values_list(*fields).get(
+            pk=instance.pk)
+
+    def test_recipe_lists_update_counters(self):
+        for path in ('favorite', 'shopping_cart'):
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id}/{path}/')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.counters(
+            self.recipe, 'favorites_count', 'in_carts_count'), (1, 1))
+
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.assertEqual(response.data['in_carts_count'], 1)
+
+        self.client.delete(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(self.counters(
+            self.recipe, 'favorites_count', 'in_carts_count'), (0, 1))
+
+    def test_repeated_favorite_does_not_change_counter(self):
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.counters(self.recipe, 'favorites_count'), (1,))
+
+    def test_subscription_updates_followers_count(self):
+        response = self.client.post(f'/api/users/{self.author.id}/subscribe/')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['followers_count'], 1)
+        self.assertEqual(response.data['recipes_count'], 1)
+
+        self.client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(self.counters(self.author, 'followers_count'), (0,))
+
+    def test_recipe_delete_updates_recipes_count(self):
+        self.client.force_authenticate(self.author)
+
+        response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters(self.author, 'recipes_count'), (0,))
+
+    def test_model_writes_and_cascades_update_counters(self):
+        Favorites.objects.create(owner=self.viewer, recipe=self.recipe)
+        ShoppingCart.objects.create(owner=self.viewer, recipe=self.recipe)
+        Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.author)
+        self.assertEqual(self.counters(
+            self.recipe, 'favorites_count', 'in_carts_count'), (1, 1))
+        self.assertEqual(self.counters(
+            self.author, 'recipes_count', 'followers_count'), (1, 1))
+
+        # Удаление пользователя каскадом удаляет его списки и подписки.
+        self.viewer.delete()
+
+        self.assertEqual(self.counters(
+            self.recipe, 'favorites_count', 'in_carts_count'), (0, 0))
+        self.assertEqual(self.counters(self.author, 'followers_count'), (0,))
+        Recipe.objects.filter(pk=self.recipe.pk).delete()
+        self.assertEqual(self.counters(self.author, 'recipes_count'), (0,))
+
+    def test_full_save_keeps_counters(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Favorites.objects.create(owner=self.viewer, recipe=self.recipe)
+
+        stale.name = 'Щи'
+        stale.save()
+
+        self.assertEqual(self.counters(
+            self.recipe, 'name', 'favorites_count'), ('Щи', 1))
+
+    def test_reconcile_fixes_drifted_counters(self):
+        Favorites.objects.create(owner=self.viewer, recipe=self.recipe)
+        Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.author)
+        UserModel.objects.filter(pk=self.author.pk).update(recipes_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_counters', '--check', stdout=io.StringIO())
+        call_command('reconcile_counters', stdout=io.StringIO())
+
+        self.assertEqual(self.counters(self.recipe, 'favorites_count'), (1,))
+        self.assertEqual(self.counters(
+            self.author, 'recipes_count', 'followers_count'), (1, 1))
+        call_command('reconcile_counters', '--check', stdout=io.StringIO())
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from api.tests import AuthenticatedTestCase
+from django.utils import timezone
+from recipes.models import Recipe
+from users.models import Subscription, UserModel
+
+
+class CursorPaginationTests(AuthenticatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = cls.create_user('viewer')
+        cls.author = cls.create_user('author')
+        created = timezone.now()
+        for number in range(7):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', image='recipes/image.png',
+                text='Текст', cooking_time=10, author=cls.author)
+            # Два рецепта с одинаковым временем проверяют ключ по id.
+            Recipe.objects.filter(pk=recipe.pk).update(
+                datetime_created=created - timedelta(minutes=number // 2))
+        for number in range(5):
+            Subscription.objects.create(
+                subscriber=cls.viewer,
+                subscribed_to=cls.create_user(f'chef{number}'))
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_recipe_cursor_walks_every_recipe_once(self):
+        expected = list(Recipe.objects.order_by(
+            '-datetime_created', '-id').values_list('id', flat=True))
+
+        self.assertEqual(
+            self.walk('/api/recipes/', {'cursor': '', 'limit': 3}), expected)
+
+    def test_cursor_mode_skips_count_query(self):
+        with self.assertNumQueries(5):
+            self.client.get('/api/recipes/')
+        with self.assertNumQueries(4):
+            self.client.get('/api/recipes/', {'cursor': ''})
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/recipes/', {'page': 2})
+
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_subscription_cursor_follows_username_order(self):
+        expected = list(UserModel.objects.filter(
+            follows__subscriber=self.viewer
+        ).order_by('username').values_list('id', flat=True))
+
+        self.assertEqual(self.walk(
+            '/api/users/subscriptions/', {'cursor': '', 'limit': 2}),
+            expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('garbage', 'WyJ4IiwgMV0='):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    '/api/recipes/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_search_keeps_relevance_order_with_cursor(self):
+        Recipe.objects.filter(name='Рецепт 6').update(name='Суп Суп')
+        Recipe.objects.filter(name='Рецепт 0').update(name='Суп')
+        # Более релевантный рецепт старше, ключ по дате поставил бы его вторым.
+        relevant = Recipe.objects.get(name='Суп Суп').pk
+        params = {'search': 'Суп'}
+        expected = [item['id'] for item in self.client.get(
+            '/api/recipes/', params).data['results']]
+        self.assertEqual(expected[0], relevant)
+
+        response = self.client.get('/api/recipes/', {**params, 'cursor': ''})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], expected)
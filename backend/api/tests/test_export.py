@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from recipes.export import export_recipes
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RecipeExportTests(TestCase):
+    url = '/api/recipes/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = UserModel.objects.create_user(
+            email='staff@foodgram.ru', username='staff', password='password',
+            first_name='Имя', last_name='Фамилия', is_staff=True)
+        lunch = Tag.objects.create(name='Обед', slug='lunch')
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', image='recipes/image.png',
+                text='Текст', cooking_time=10, author=cls.staff)
+            recipe.tags.add(lunch)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=number + 1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def download(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_contains_tags_and_ingredients(self):
+        rows = [json.loads(line)
+                for line in self.download({}).splitlines()]
+
+        self.assertEqual([row['name'] for row in rows],
+                         [f'Рецепт {number}' for number in range(5)])
+        self.assertEqual(rows[2]['tags'], ['lunch'])
+        self.assertEqual(rows[2]['ingredients'], [
+            {'amount': 3, 'name': 'Соль', 'measurement_unit': 'г'}])
+        self.assertEqual(rows[0]['author_username'], 'staff')
+
+    def test_csv_has_header_and_row_per_recipe(self):
+        rows = list(csv.DictReader(io.StringIO(
+            self.download({'format': 'csv'}))))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(json.loads(rows[0]['tags']), ['lunch'])
+
+    def test_chunks_use_constant_queries(self):
+        # Один курсор по рецептам и по два запроса на каждую порцию.
+        with self.assertNumQueries(1 + 2 * 3):
+            rows = list(export_recipes(chunk_size=2))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([row['ingredients'][0]['amount'] for row in rows],
+                         [1, 2, 3, 4, 5])
+
+    def test_export_is_staff_only(self):
+        user = UserModel.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password',
+            first_name='Имя', last_name='Фамилия')
+        self.client.force_authenticate(user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_writes_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as target:
+            call_command('export_recipes', format='csv', output=target.name,
+                         stdout=io.StringIO())
+            with open(target.name, encoding='utf-8') as export_file:
+                self.assertEqual(len(export_file.read().splitlines()), 6)
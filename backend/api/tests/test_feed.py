@@ -0,0 +1,102 @@
+from datetime import timedelta
+from unittest import mock
+
+from api.tests import AuthenticatedTestCase
+from api.views import RecipeViewset
+from django.test import override_settings
+from django.utils import timezone
+from recipes.feed import fan_out
+from recipes.models import FeedItem, Recipe
+from rest_framework.test import APIClient
+from users.models import Subscription
+
+
+class FeedTests(AuthenticatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = cls.create_user('viewer')
+        cls.author = cls.create_user('author')
+        cls.stranger = cls.create_user('stranger')
+        created = timezone.now()
+        Recipe.objects.bulk_create(
+            Recipe(name=f'Рецепт {number}', image='recipes/image.png',
+                   text='Текст', cooking_time=10,
+                   author=cls.stranger if number == 0 else cls.author,
+                   datetime_created=created - timedelta(minutes=number))
+            for number in range(6)
+        )
+
+    def recipes_of(self, *authors):
+        return list(Recipe.objects.filter(author__in=authors).order_by(
+            '-datetime_created', '-id').values_list('id', flat=True))
+
+    def walk(self, params):
+        ids = []
+        response = self.client.get('/api/recipes/feed/', params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_subscription_backfills_and_unsubscribe_clears_feed(self):
+        subscription = Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.author)
+
+        self.assertEqual(
+            sorted(FeedItem.objects.filter(owner=self.viewer).values_list(
+                'recipe_id', flat=True)),
+            sorted(self.recipes_of(self.author)))
+
+        subscription.delete()
+
+        self.assertFalse(FeedItem.objects.filter(owner=self.viewer).exists())
+
+    def test_new_recipe_is_fanned_out_after_commit(self):
+        Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.stranger)
+        with self.captureOnCommitCallbacks() as callbacks, \
+                mock.patch('recipes.signals.schedule_variants'):
+            recipe = Recipe.objects.create(
+                name='Новый', image='recipes/image.png', text='Текст',
+                cooking_time=5, author=self.stranger)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(FeedItem.objects.filter(recipe=recipe).exists())
+
+        fan_out(recipe.id)
+
+        self.assertTrue(FeedItem.objects.filter(
+            owner=self.viewer, recipe=recipe).exists())
+
+    def test_feed_pages_through_followed_recipes(self):
+        Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.author)
+
+        with self.assertNumQueries(RecipeViewset.query_budgets['feed']):
+            response = self.client.get('/api/recipes/feed/', {'limit': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(self.walk({'limit': 2}),
+                         self.recipes_of(self.author))
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_is_merged_on_read(self):
+        Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.author)
+        Subscription.objects.create(
+            subscriber=self.viewer, subscribed_to=self.stranger)
+        recipe = Recipe.objects.filter(author=self.stranger).get()
+
+        fan_out(recipe.id)
+
+        self.stranger.refresh_from_db()
+        self.assertTrue(self.stranger.feed_on_read)
+        FeedItem.objects.filter(recipe__author=self.stranger).delete()
+        self.assertEqual(self.walk({'limit': 4}),
+                         self.recipes_of(self.author, self.stranger))
+
+    def test_feed_requires_authentication(self):
+        response = APIClient().get('/api/recipes/feed/')
+
+        self.assertEqual(response.status_code, 401)
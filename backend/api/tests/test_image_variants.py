@@ -0,0 +1,142 @@
+import base64
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipes import images
+from recipes.constants import IMAGE_VARIANTS
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+def encode_image(size):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImageVariantsTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(images.ready_images.clear)
+        self.addCleanup(images.pending_images.clear)
+        self.user = UserModel.objects.create_user(
+            email='chef@foodgram.ru', username='chef', password='password',
+            first_name='Имя', last_name='Фамилия')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def put_avatar(self, size):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.put(
+                '/api/users/me/avatar/', {'avatar': encode_image(size)},
+                format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.user.refresh_from_db()
+        return response
+
+    def test_avatar_response_is_not_revalidated(self):
+        response = self.put_avatar((40, 30))
+        self.assertEqual(
+            response.data['avatar'],
+            'http://testserver' + self.user.avatar.url)
+
+    def test_original_is_served_until_variants_exist(self):
+        self.put_avatar((2000, 1000))
+        original = 'http://testserver' + self.user.avatar.url
+        variants = self.client.get('/api/users/me/').data['avatar_variants']
+        self.assertEqual(variants, dict.fromkeys(IMAGE_VARIANTS, original))
+
+        images.run_generation(self.user.avatar.name)
+
+        variants = self.client.get('/api/users/me/').data['avatar_variants']
+        for variant, size in IMAGE_VARIANTS.items():
+            name = images.variant_name(self.user.avatar.name, variant)
+            self.assertEqual(
+                variants[variant],
+                'http://testserver' + default_storage.url(name))
+            with default_storage.open(name) as variant_file:
+                self.assertEqual(
+                    Image.open(variant_file).size, (size, size // 2))
+
+    def test_deleting_avatar_removes_variants(self):
+        self.put_avatar((300, 300))
+        name = self.user.avatar.name
+        images.generate_variants(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/users/me/avatar/')
+
+        self.assertEqual(response.status_code, 204)
+        for variant in IMAGE_VARIANTS:
+            self.assertFalse(
+                default_storage.exists(images.variant_name(name, variant)))
+        self.assertFalse(default_storage.exists(name))
+        self.assertNotIn(name, images.ready_images)
+
+    def test_missing_variants_are_scheduled_once(self):
+        self.put_avatar((300, 300))
+        name = self.user.avatar.name
+        images.pending_images.clear()
+
+        with mock.patch.object(images, 'executor') as executor, \
+                mock.patch.object(default_storage, 'exists',
+                                  wraps=default_storage.exists) as exists:
+            for _ in range(3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.get('/api/users/me/')
+
+        executor.submit.assert_called_once_with(images.run_generation, name)
+        self.assertEqual(exists.call_count, 1)
+        images.run_generation(name)
+        self.assertIn(name, images.ready_images)
+        self.assertNotIn(name, images.pending_images)
+
+    def test_rolled_back_schedule_is_not_pending(self):
+        self.put_avatar((300, 300))
+        images.pending_images.clear()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                images.schedule_variants(self.user.avatar)
+                transaction.set_rollback(True)
+
+        self.assertEqual(callbacks, [])
+        self.assertNotIn(self.user.avatar.name, images.pending_images)
+
+    def test_failed_generation_is_not_pending(self):
+        name = 'users/missing.png'
+        images.pending_images.add(name)
+
+        with self.assertLogs('recipes.images', 'ERROR'):
+            images.run_generation(name)
+
+        self.assertNotIn(name, images.pending_images)
+        self.assertNotIn(name, images.ready_images)
+
+    def test_command_builds_missing_variants(self):
+        self.put_avatar((300, 300))
+        name = self.user.avatar.name
+
+        stdout = StringIO()
+        call_command('build_image_variants', stdout=stdout)
+        call_command('build_image_variants', stdout=stdout)
+
+        self.assertTrue(default_storage.exists(
+            images.variant_name(name, 'full')))
+        self.assertIn('Подготовлено: 1, уже были: 0', stdout.getvalue())
+        self.assertIn('Подготовлено: 0, уже были: 1', stdout.getvalue())
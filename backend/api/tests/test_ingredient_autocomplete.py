@@ -0,0 +1,67 @@
+from django.test import TestCase
+from recipes.autocomplete import IngredientIndex, ingredient_index
+from recipes.models import Ingredient
+from rest_framework.test import APIClient
+
+NAMES = ('Соль', 'Соль морская', 'Морская соль', 'Солод', 'Ёжевика',
+         'Сахар', 'Фасоль', 'Оливковое масло')
+
+
+class IngredientIndexTests(TestCase):
+
+    def setUp(self):
+        self.index = IngredientIndex(
+            {'id': number, 'name': name, 'measurement_unit': 'г'}
+            for number, name in enumerate(NAMES)
+        )
+
+    def names(self, query, limit=None):
+        return [item['name'] for item in self.index.search(query, limit)]
+
+    def test_prefix_is_case_insensitive_and_ranked_first(self):
+        self.assertEqual(
+            self.names('СОЛ'),
+            ['Солод', 'Соль', 'Соль морская', 'Морская соль', 'Фасоль']
+        )
+
+    def test_yo_is_folded(self):
+        self.assertEqual(self.names('еж'), ['Ёжевика'])
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.names('сахр'), ['Сахар'])
+        self.assertEqual(self.names('оливкавое'), ['Оливковое масло'])
+
+    def test_limit(self):
+        self.assertEqual(self.names('сол', limit=2), ['Солод', 'Соль'])
+        self.assertEqual(len(self.names('', limit=3)), 3)
+
+
+class IngredientAutocompleteAPITests(TestCase):
+    url = '/api/ingredients/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in NAMES)
+
+    def setUp(self):
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def test_warm_index_does_not_query_database(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'name': 'сол', 'limit': 1})
+        self.assertEqual(
+            [item['name'] for item in response.data], ['Солод'])
+
+    def test_changes_invalidate_index(self):
+        self.client.get(self.url)
+        Ingredient.objects.create(name='Солёный огурец', measurement_unit='г')
+        response = self.client.get(self.url, {'name': 'солен'})
+        self.assertEqual(
+            [item['name'] for item in response.data], ['Солёный огурец'])
+
+    def test_invalid_limit(self):
+        response = self.client.get(self.url, {'limit': 'много'})
+        self.assertEqual(response.status_code, 400)
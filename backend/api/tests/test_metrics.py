@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from foodgram_backend.metrics import (instrument_connections, record_query,
+                                      registry)
+from recipes.models import Recipe
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password',
+            first_name='Имя', last_name='Фамилия', is_staff=True)
+        Recipe.objects.create(
+            name='Борщ', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=cls.user)
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def timings(self, response):
+        return dict(
+            re.match(r'(\w+);dur=([\d.]+)', entry).groups()
+            for entry in response['Server-Timing'].split(', '))
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_server_timing_counts_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'desc="{len(queries)} queries"',
+                      response['Server-Timing'])
+        self.assertEqual(
+            set(self.timings(response)),
+            {'db', 'serialize', 'render', 'total'})
+        self.assertGreater(float(self.timings(response)['render']), 0)
+
+    def test_metrics_report_quantiles_per_action(self):
+        for _ in range(3):
+            response = self.client.get('/api/recipes/')
+        queries = re.search(r'"(\d+) queries"',
+                            response['Server-Timing']).group(1)
+        labels = 'route="RecipeViewset.list",method="GET"'
+
+        text = self.scrape()
+
+        self.assertIn(
+            f'foodgram_db_queries{{{labels},quantile="0.99"}} {queries}',
+            text)
+        self.assertIn(f'foodgram_request_duration_seconds_count{{{labels}}} 3',
+                      text)
+        self.assertIn(
+            f'foodgram_response_bytes_sum{{{labels}}}'
+            f' {3 * len(response.content)}', text)
+
+    def test_streamed_response_size_is_recorded_when_consumed(self):
+        response = self.client.get('/api/recipes/export/',
+                                   {'format': 'ndjson'})
+        size = len(b''.join(response.streaming_content))
+
+        self.assertIn(
+            'foodgram_response_bytes_sum{route="RecipeViewset.export"'
+            f',method="GET"}} {size}', self.scrape())
+
+    def test_streamed_queries_are_recorded_when_consumed(self):
+        labels = 'route="RecipeViewset.export",method="GET"'
+        response = self.client.get('/api/recipes/export/',
+                                   {'format': 'ndjson'})
+        self.assertNotIn(f'foodgram_db_queries_count{{{labels}}}',
+                         self.scrape())
+
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(response.streaming_content)
+
+        self.assertGreater(len(queries), 0)
+        self.assertIn(
+            f'foodgram_db_queries{{{labels},quantile="0.5"}} {len(queries)}',
+            self.scrape())
+
+    def test_metrics_are_merged_across_workers(self):
+        labels = 'route="RecipeViewset.list",method="GET"'
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            # Файл другого воркера gunicorn.
+            with open(os.path.join(directory, 'worker-1.json'), 'w') as file:
+                json.dump([['db_queries', 'RecipeViewset.list', 'GET',
+                            [100, 100], 2, 200]], file)
+            response = self.client.get('/api/recipes/')
+            queries = re.search(r'"(\d+) queries"',
+                                response['Server-Timing']).group(1)
+
+            text = self.scrape()
+            registry.clear_shared()
+            self.assertEqual(os.listdir(directory), [])
+
+        self.assertIn(f'foodgram_db_queries_count{{{labels}}} 3', text)
+        self.assertIn(
+            f'foodgram_db_queries_sum{{{labels}}} {200 + int(queries)}', text)
+        self.assertIn(
+            f'foodgram_db_queries{{{labels},quantile="0.5"}} 100', text)
+
+    def test_metrics_are_restricted(self):
+        self.assertEqual(
+            self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code,
+            403)
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(
+                '/metrics', REMOTE_ADDR='203.0.113.5',
+                HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(
+                '/metrics', REMOTE_ADDR='203.0.113.5',
+                HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def unwrap_connection(self):
+        # Соединение открыто до того, как сигнал успел его обернуть.
+        if record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(record_query)
+        self.addCleanup(instrument_connections)
+
+    async def test_queries_are_counted_under_asgi(self):
+        await sync_to_async(self.unwrap_connection)()
+
+        response = await self.async_client.get('/api/recipes/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
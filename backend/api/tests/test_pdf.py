@@ -0,0 +1,135 @@
+import io
+import os
+import re
+import struct
+import zlib
+
+from api.pdf import (LINE_WIDTH, LINES_PER_PAGE, font_checksum, load_font,
+                     stream_pdf, wrap_line)
+from django.conf import settings
+from django.test import SimpleTestCase
+from PIL import Image, ImageDraw, ImageFont
+
+FONT = settings.SHOPPING_LIST_PDF_FONT
+
+
+def pdf_streams(content):
+    for match in re.finditer(
+            rb'/Length (\d+) /Filter /FlateDecode (.*?)>>\nstream\n',
+            content):
+        start = match.end()
+        yield match.group(2), zlib.decompress(
+            content[start:start + int(match.group(1))])
+
+
+def render(font, text):
+    image = Image.new('L', (600, 40))
+    ImageDraw.Draw(image).text((0, 0), text, fill=255, font=font)
+    return image
+
+
+class PDFFontTests(SimpleTestCase):
+
+    def setUp(self):
+        if not os.path.exists(FONT):
+            self.skipTest('Шрифт для PDF не установлен.')
+        self.font = load_font(FONT)
+
+    def build(self, lines):
+        return b''.join(stream_pdf(lines, FONT))
+
+    def font_data(self, content):
+        return next(data for extra, data in pdf_streams(content)
+                    if extra.startswith(b'/Length1'))
+
+    def page_strings(self, content):
+        return [
+            bytes.fromhex(string.decode())
+            for extra, data in pdf_streams(content) if data.startswith(b'BT')
+            for string in re.findall(rb'<([0-9A-F]*)> Tj', data)
+        ]
+
+    def test_cmap_and_metrics_are_parsed(self):
+        glyph = self.font.glyphs['Ж']
+
+        self.assertEqual(self.font.units_per_em, 2048)
+        self.assertGreater(glyph, 0)
+        self.assertGreater(self.font.width(glyph), 0)
+        self.assertNotEqual(self.font.glyphs['ж'], glyph)
+        self.assertEqual(self.font.text_width('ЖЖ'),
+                         2 * self.font.width(glyph))
+        self.assertNotIn('漢', self.font.glyphs)
+
+    def test_subset_renders_like_original(self):
+        text = 'Соль, Ёжик, йогурт, café - 15 г'
+        content = self.build([text])
+        subset = ImageFont.truetype(io.BytesIO(self.font_data(content)), 24)
+        original = ImageFont.truetype(FONT, 24)
+
+        self.assertEqual(render(subset, text).tobytes(),
+                         render(original, text).tobytes())
+        self.assertIsNone(render(subset, 'ЩQ').getbbox())
+
+    def test_composite_glyph_parts_are_kept(self):
+        # Ё собрана из Е и диерезиса, которых нет в самом тексте.
+        composite = self.font.glyphs['Ё']
+        parts = list(self.font.components(composite))
+        subset = ImageFont.truetype(
+            io.BytesIO(self.font.subset([composite])), 24)
+        original = ImageFont.truetype(FONT, 24)
+
+        self.assertEqual(len(parts), 2)
+        self.assertEqual(render(subset, 'Ё').tobytes(),
+                         render(original, 'Ё').tobytes())
+
+    def test_subset_checksums_are_valid(self):
+        data = self.font.subset([self.font.glyphs['ж']])
+        num_tables = struct.unpack_from('>H', data, 4)[0]
+
+        for index in range(num_tables):
+            tag, checksum, offset, length = struct.unpack_from(
+                '>4sIII', data, 12 + index * 16)
+            table = bytearray(data[offset:offset + length])
+            if tag == b'head':
+                struct.pack_into('>I', table, 8, 0)
+            self.assertEqual(font_checksum(bytes(table)), checksum, tag)
+        self.assertEqual(font_checksum(data), 0xB1B0AFBA)
+
+    def test_missing_glyphs_use_notdef(self):
+        content = self.build(['漢字 - 1 г'])
+        subset = ImageFont.truetype(io.BytesIO(self.font_data(content)), 24)
+
+        self.assertEqual(self.page_strings(content)[0][:4], bytes(4))
+        self.assertEqual(render(subset, '漢').tobytes(),
+                         render(ImageFont.truetype(FONT, 24), '漢').tobytes())
+        self.assertIsNotNone(render(subset, '漢').getbbox())
+
+    def test_lines_are_wrapped_by_words(self):
+        line = 'Очень длинное название ингредиента ' * 6 + '- 1 г'
+        pieces = list(wrap_line(self.font, line))
+
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(' '.join(pieces), line)
+        self.assertTrue(all(self.font.text_width(piece) <= LINE_WIDTH
+                            for piece in pieces))
+        self.assertEqual(list(wrap_line(self.font, '')), [''])
+
+    def test_long_words_are_split_by_characters(self):
+        pieces = list(wrap_line(self.font, 'ж' * 200))
+
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(''.join(pieces), 'ж' * 200)
+        self.assertTrue(all(self.font.text_width(piece) <= LINE_WIDTH
+                            for piece in pieces))
+
+    def test_very_long_line_spans_pages(self):
+        content = self.build(['слово ' * 3000])
+        strings = self.page_strings(content)
+        pages = int(re.search(rb'/Count (\d+)', content).group(1))
+
+        self.assertGreater(len(strings), LINES_PER_PAGE)
+        self.assertEqual(pages, -(-len(strings) // LINES_PER_PAGE))
+        for string in strings:
+            glyphs = struct.unpack(f'>{len(string) // 2}H', string)
+            self.assertLessEqual(
+                sum(self.font.width(glyph) for glyph in glyphs), LINE_WIDTH)
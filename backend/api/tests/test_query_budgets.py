@@ -0,0 +1,142 @@
+from itertools import count
+
+from api.tests import AuthenticatedTestCase
+from api.views import (REDIRECT_SHORT_LINK_QUERY_BUDGET, IngredientViewset,
+                       RecipeViewset, TagViewset, UserModelViewSet)
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription, UserModel
+
+SMALL_SEED = 2
+LARGE_SEED = 10
+
+
+class QueryBudgetTests(AuthenticatedTestCase):
+    sequence = count()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = cls.create_user('viewer')
+        cls.staff = cls.create_user('staff', is_staff=True)
+
+    def seed(self, size):
+        for _ in range(size):
+            number = next(self.sequence)
+            author = self.create_user(f'author{number}')
+            tag = Tag.objects.create(name=f'Тэг {number}',
+                                     slug=f'tag-{number}')
+            ingredient = Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}',
+                image='recipes/image.png',
+                text='Текст',
+                cooking_time=10,
+                author=author,
+            )
+            recipe.tags.add(tag)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=5)
+            Favorites.objects.create(owner=self.viewer, recipe=recipe)
+            ShoppingCart.objects.create(owner=self.viewer, recipe=recipe)
+            Subscription.objects.create(
+                subscriber=self.viewer, subscribed_to=author)
+        return recipe
+
+    def assertQueryBudget(self, budget, url, user=None,
+                          status_code=200):
+        client = self.client_for(user)
+        for size in (SMALL_SEED, LARGE_SEED):
+            with self.subTest(url=url, seed=size):
+                self.seed(size)
+                path = url() if callable(url) else url
+                with self.assertNumQueries(budget):
+                    response = client.get(path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, status_code)
+
+    def test_recipe_list(self):
+        budget = RecipeViewset.query_budgets['list']
+        self.assertQueryBudget(budget, '/api/recipes/')
+        self.assertQueryBudget(budget, '/api/recipes/', self.viewer)
+
+    def test_recipe_list_filtered(self):
+        self.assertQueryBudget(
+            RecipeViewset.query_budgets['list'],
+            '/api/recipes/?is_favorited=1&is_in_shopping_cart=1',
+            self.viewer,
+        )
+
+    def test_recipe_detail(self):
+        self.assertQueryBudget(
+            RecipeViewset.query_budgets['retrieve'],
+            lambda: f'/api/recipes/{Recipe.objects.latest("pk").pk}/',
+            self.viewer,
+        )
+
+    def test_recipe_short_link(self):
+        self.assertQueryBudget(
+            RecipeViewset.query_budgets['short_link'],
+            lambda: f'/api/recipes/{Recipe.objects.latest("pk").pk}'
+                    '/get-link/',
+        )
+
+    def test_cart_download(self):
+        self.assertQueryBudget(
+            RecipeViewset.query_budgets['cart_download'],
+            '/api/recipes/download_shopping_cart/',
+            self.viewer,
+        )
+
+    def test_short_link_redirect(self):
+        def url():
+            short_link = Recipe.objects.latest('pk').get_short_link()
+            return short_link[short_link.index('/s/'):] + '/'
+
+        self.assertQueryBudget(
+            REDIRECT_SHORT_LINK_QUERY_BUDGET, url, status_code=302)
+
+    def test_user_list(self):
+        self.assertQueryBudget(
+            UserModelViewSet.query_budgets['list'], '/api/users/', self.staff)
+
+    def test_user_detail(self):
+        self.assertQueryBudget(
+            UserModelViewSet.query_budgets['retrieve'],
+            lambda: f'/api/users/{UserModel.objects.latest("pk").pk}/',
+            self.viewer,
+        )
+
+    def test_user_me(self):
+        self.assertQueryBudget(
+            UserModelViewSet.query_budgets['me'],
+            '/api/users/me/',
+            self.viewer,
+        )
+
+    def test_subscriptions(self):
+        self.assertQueryBudget(
+            UserModelViewSet.query_budgets['subscription_get'],
+            '/api/users/subscriptions/?recipes_limit=2',
+            self.viewer,
+        )
+
+    def test_tags(self):
+        self.assertQueryBudget(
+            TagViewset.query_budgets['list'], '/api/tags/')
+
+    def test_ingredients(self):
+        budget = IngredientViewset.query_budgets['list']
+        self.assertQueryBudget(budget, '/api/ingredients/')
+        self.assertQueryBudget(budget, '/api/ingredients/?name=Ингр')
+
+    def test_short_link_redirect_is_cached(self):
+        recipe = self.seed(1)
+        path = f'/s/{recipe.short_code}/'
+        client = self.client_for(None)
+        client.get(path)
+        with self.assertNumQueries(0):
+            response = client.get(path)
+        self.assertEqual(response['Location'], f'/recipes/{recipe.pk}')
+        self.assertIn('max-age', response['Cache-Control'])
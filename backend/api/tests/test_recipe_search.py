@@ -0,0 +1,59 @@
+from django.test import TestCase
+from recipes.models import Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+class RecipeSearchTests(TestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        author = UserModel.objects.create(
+            email='author@foodgram.ru', username='author',
+            first_name='Имя', last_name='Фамилия')
+        cls.soup = Tag.objects.create(name='Суп', slug='soup')
+        recipes = {
+            'Борщ': 'Свёкла, капуста и картофель.',
+            'Картофельное пюре': 'Картофель отварить и размять.',
+            'Щи': 'Квашеная капуста и картофель.',
+            'Ёжики': 'Фарш и рис.',
+        }
+        cls.recipes = {
+            name: Recipe.objects.create(
+                name=name, text=text, image='recipes/image.png',
+                cooking_time=10, author=author)
+            for name, text in recipes.items()
+        }
+        cls.recipes['Щи'].tags.add(cls.soup)
+
+    def search(self, query, **params):
+        response = APIClient().get(self.url, {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_name_matches_rank_first(self):
+        names = self.search('картоф')
+        self.assertEqual(names[0], 'Картофельное пюре')
+        self.assertCountEqual(
+            names, ['Картофельное пюре', 'Борщ', 'Щи'])
+
+    def test_case_and_yo_insensitive(self):
+        self.assertEqual(self.search('ЕЖИК'), ['Ёжики'])
+        self.assertEqual(self.search('свекла'), ['Борщ'])
+
+    def test_all_terms_required(self):
+        self.assertCountEqual(self.search('капуста картофель'),
+                              ['Борщ', 'Щи'])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self.search('капуста', tags='soup'), ['Щи'])
+
+    def test_index_follows_updates_and_deletes(self):
+        recipe = self.recipes['Ёжики']
+        recipe.name = 'Тефтели'
+        recipe.save()
+        self.assertEqual(self.search('ежики'), [])
+        self.assertEqual(self.search('тефтели'), ['Тефтели'])
+        recipe.delete()
+        self.assertEqual(self.search('тефтели'), [])
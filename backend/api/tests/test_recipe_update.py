@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListItem, Tag)
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RecipeUpdateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = UserModel.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            password='password', first_name='Имя', last_name='Фамилия')
+        cls.buyer = UserModel.objects.create_user(
+            email='buyer@foodgram.ru', username='buyer',
+            password='password', first_name='Имя', last_name='Фамилия')
+        cls.salt, cls.sugar, cls.milk = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Сахар', 'Молоко'))
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=cls.author)
+        cls.recipe.tags.add(cls.tag)
+        for ingredient, amount in ((cls.salt, 5), (cls.sugar, 10)):
+            RecipeIngredient.objects.create(
+                recipe=cls.recipe, ingredient=ingredient, amount=amount)
+        ShoppingCart.objects.create(owner=cls.buyer, recipe=cls.recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def patch(self, ingredients, **fields):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'tags': [self.tag.pk], 'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient, amount in ingredients
+            ], **fields},
+            format='json'
+        )
+
+    def rows(self):
+        return {
+            ingredient_id: (pk, amount) for pk, ingredient_id, amount
+            in RecipeIngredient.objects.filter(recipe=self.recipe)
+            .values_list('pk', 'ingredient_id', 'amount')
+        }
+
+    def test_only_changed_rows_are_written(self):
+        before = self.rows()
+
+        response = self.patch(((self.salt, 5), (self.sugar, 3),
+                               (self.milk, 200)))
+
+        self.assertEqual(response.status_code, 200)
+        after = self.rows()
+        self.assertEqual(after[self.salt.pk], before[self.salt.pk])
+        self.assertEqual(after[self.sugar.pk],
+                         (before[self.sugar.pk][0], 3))
+        self.assertEqual(after[self.milk.pk][1], 200)
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(owner=self.buyer)
+                 .values_list('ingredient_id', 'total_amount')),
+            {self.salt.pk: 5, self.sugar.pk: 3, self.milk.pk: 200})
+
+    def test_removed_ingredient_leaves_shopping_list(self):
+        response = self.patch(((self.salt, 5),))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(self.rows()), {self.salt.pk})
+        self.assertFalse(ShoppingListItem.objects.filter(
+            owner=self.buyer, ingredient=self.sugar).exists())
+
+    def test_failed_update_is_rolled_back(self):
+        with mock.patch.object(RecipeIngredient.objects, 'bulk_update',
+                               side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.patch(((self.salt, 1),), name='Новое название')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Рецепт')
+        self.assertEqual(self.rows()[self.salt.pk][1], 5)
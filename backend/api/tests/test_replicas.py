@@ -0,0 +1,107 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from recipes import images
+from recipes.models import Recipe
+from rest_framework.test import APIClient
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        # Отдельный файл SQLite без репликации: что прочитано из него,
+        # прочитано именно с реплики.
+        cls.directory = tempfile.TemporaryDirectory()
+        directory = Path(cls.directory.name)
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': str(directory / 'replica.sqlite3'),
+            'TEST': {},
+        }
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=directory, SNAPSHOT_ROOT=directory / 'snapshots')
+        cls.settings_override.enable()
+        call_command('migrate', database='replica', verbosity=0)
+        cls.replicas_override = override_settings(
+            DATABASE_REPLICAS=['replica'])
+        cls.replicas_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replicas_override.disable()
+        cls.settings_override.disable()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        cls.directory.cleanup()
+
+    def setUp(self):
+        # Варианты картинок ставятся в очередь и при чтении.
+        for name in ('recipes.images.executor',
+                     'recipes.signals.schedule_fan_out'):
+            patcher = mock.patch(name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(images.pending_images.clear)
+        self.user = UserModel.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password',
+            first_name='Имя', last_name='Фамилия')
+        self.recipe = Recipe.objects.create(
+            name='Борщ', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def recipe_ids(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.recipe_ids(), [])
+        self.assertFalse(Recipe.objects.using('replica').exists())
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'default'])
+    def test_replica_is_chosen_once_per_request(self):
+        with mock.patch('foodgram_backend.replicas.random.choice',
+                        return_value='replica') as choice:
+            self.assertEqual(self.recipe_ids(), [])
+
+        choice.assert_called_once_with(['replica', 'default'])
+
+    def test_streamed_body_is_read_from_replica(self):
+        UserModel.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get('/api/recipes/export/',
+                                   {'format': 'ndjson'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_writer_is_pinned_to_primary(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('primary_pin', response.cookies)
+
+        self.assertEqual(self.recipe_ids(), [self.recipe.id])
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post('/api/recipes/', {}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('primary_pin', response.cookies)
+        self.assertEqual(self.recipe_ids(), [])
@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import os
+
+from api.pdf import stream_pdf
+from api.tests import AuthenticatedTestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListItem, Tag)
+
+
+class ShoppingListDownloadTests(AuthenticatedTestCase):
+    client_user = 'owner'
+    url = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.create_user('owner')
+        cls.other = cls.create_user('other')
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+        for number, amounts in enumerate(((salt, 5), (salt, 10))):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', image='recipes/image.png',
+                text='Текст', cooking_time=10, author=cls.other)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=amounts[0], amount=amounts[1])
+            ShoppingCart.objects.create(owner=cls.owner, recipe=recipe)
+        foreign = Recipe.objects.create(
+            name='Чужой рецепт', image='recipes/image.png',
+            text='Текст', cooking_time=10, author=cls.other)
+        RecipeIngredient.objects.create(
+            recipe=foreign, ingredient=milk, amount=200)
+        RecipeIngredient.objects.create(
+            recipe=foreign, ingredient=salt, amount=1)
+        ShoppingCart.objects.create(owner=cls.other, recipe=foreign)
+
+    def download(self, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_text_is_default_and_only_contains_own_cart(self):
+        response, content = self.download()
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertEqual(content, 'Соль - 15 г\n')
+
+    def test_csv(self):
+        response, content = self.download('?format=csv')
+        self.assertIn('shopping_list.csv', response['Content-Disposition'])
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content))),
+            [['name', 'amount', 'measurement_unit'], ['Соль', '15', 'г']]
+        )
+
+    def test_json(self):
+        _, content = self.download('?format=json')
+        self.assertEqual(
+            json.loads(content),
+            [{'name': 'Соль', 'measurement_unit': 'г', 'amount': 15}]
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url + '?format=xls')
+        self.assertEqual(response.status_code, 404)
+
+
+class StreamPDFTests(TestCase):
+
+    def setUp(self):
+        if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+            self.skipTest('Шрифт для PDF не установлен.')
+
+    def test_pdf_structure(self):
+        lines = (f'Ингредиент {number} - 1 г' for number in range(100))
+        content = b''.join(
+            stream_pdf(lines, settings.SHOPPING_LIST_PDF_FONT))
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+        self.assertIn(b'/Count 3', content)
+        startxref = int(content.rsplit(b'startxref\n', 1)[1].split()[0])
+        self.assertTrue(content[startxref:].startswith(b'xref'))
+
+
+class ShoppingListMaintenanceTests(AuthenticatedTestCase):
+    client_user = 'buyer'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.buyer = cls.create_user('buyer')
+        cls.salt = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        cls.sugar = Ingredient.objects.create(
+            name='Сахар', measurement_unit='г')
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.recipes = []
+        for number in range(2):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', image='recipes/image.png',
+                text='Текст', cooking_time=10, author=cls.author)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.salt, amount=5)
+            cls.recipes.append(recipe)
+
+    def totals(self):
+        return dict(ShoppingListItem.objects.filter(
+            owner=self.buyer).values_list('ingredient__name', 'total_amount'))
+
+    def cart_url(self, recipe):
+        return f'/api/recipes/{recipe.pk}/shopping_cart/'
+
+    def test_cart_add_and_remove(self):
+        for recipe in self.recipes:
+            self.client.post(self.cart_url(recipe))
+        self.assertEqual(self.totals(), {'Соль': 10})
+        self.client.delete(self.cart_url(self.recipes[0]))
+        self.assertEqual(self.totals(), {'Соль': 5})
+        self.client.delete(self.cart_url(self.recipes[1]))
+        self.assertEqual(self.totals(), {})
+
+    def test_removing_missing_cart_entry(self):
+        response = self.client.delete(self.cart_url(self.recipes[0]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_carted_recipe_update_and_delete(self):
+        recipe = self.recipes[0]
+        self.client.post(self.cart_url(recipe))
+        author_client = self.client_for(self.author)
+        author_client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {'tags': [self.tag.pk], 'ingredients': [
+                {'id': self.salt.pk, 'amount': 3},
+                {'id': self.sugar.pk, 'amount': 7},
+            ], 'name': 'Новое', 'text': 'Текст', 'cooking_time': 5},
+            format='json'
+        )
+        self.assertEqual(self.totals(), {'Соль': 3, 'Сахар': 7})
+        author_client.delete(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(self.totals(), {})
+
+    def test_author_deletion_updates_other_lists(self):
+        self.client.post(self.cart_url(self.recipes[0]))
+
+        author_client = self.client_for(self.author)
+        response = author_client.delete('/api/users/me/',
+                                        {'current_password': 'password'})
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.totals(), {})
+
+    def test_direct_edits_update_totals(self):
+        cart = ShoppingCart.objects.create(
+            owner=self.buyer, recipe=self.recipes[0])
+        item = RecipeIngredient.objects.get(recipe=self.recipes[0])
+        item.amount = 8
+        item.save()
+        RecipeIngredient.objects.create(
+            recipe=self.recipes[0], ingredient=self.sugar, amount=2)
+        self.assertEqual(self.totals(), {'Соль': 8, 'Сахар': 2})
+
+        RecipeIngredient.objects.filter(ingredient=self.sugar).delete()
+        self.assertEqual(self.totals(), {'Соль': 8})
+
+        cart.delete()
+        self.assertEqual(self.totals(), {})
+
+    def test_rebuild_command(self):
+        # bulk_create обходит сигналы и оставляет итоги устаревшими.
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(owner=self.buyer, recipe=self.recipes[0])])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shopping_lists', check=True,
+                         stdout=io.StringIO())
+        call_command('rebuild_shopping_lists', stdout=io.StringIO())
+        self.assertEqual(self.totals(), {'Соль': 5})
+        call_command('rebuild_shopping_lists', check=True,
+                     stdout=io.StringIO())
@@ -0,0 +1,93 @@
+import gzip
+import json
+import tempfile
+
+from django.test import TestCase, override_settings
+from recipes import snapshots
+from recipes.models import Ingredient, Tag
+from rest_framework.test import APIClient
+
+
+class CatalogSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create не шлёт сигналов и не ставит пересборку снимков.
+        Tag.objects.bulk_create([
+            Tag(name='Завтрак', slug='breakfast'),
+            Tag(name='Обед', slug='lunch'),
+        ])
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соль', measurement_unit='г'),
+            Ingredient(name='Ёжевика', measurement_unit='г'),
+        ])
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(SNAPSHOT_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+
+    def test_snapshot_matches_rendered_response(self):
+        for name in snapshots.SNAPSHOTS:
+            with self.subTest(name=name):
+                url = f'/api/{name}/'
+                rendered = self.client.get(url)
+                self.assertNotIn('ETag', rendered)
+                snapshots.build_snapshot(name)
+
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+
+                self.assertEqual(response.content, rendered.content)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_compressed_variants_and_not_modified(self):
+        snapshots.build_snapshot('tags')
+        plain = self.client.get('/api/tags/')
+
+        response = self.client.get(
+            '/api/tags/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        if snapshots.brotli is not None:
+            response = self.client.get(
+                '/api/tags/', HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(snapshots.brotli.decompress(response.content),
+                             plain.content)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/tags/', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_rebuild_snapshot_once_per_transaction(self):
+        snapshots.build_snapshot('tags')
+        etag = self.client.get('/api/tags/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Tag.objects.create(name='Ужин', slug='dinner')
+            Tag.objects.filter(slug='lunch').get().delete()
+        self.assertEqual(len(callbacks), 1)
+
+        response = self.client.get('/api/tags/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            [tag['slug'] for tag in json.loads(response.content)],
+            ['breakfast', 'dinner'])
+
+    def test_filtered_ingredients_bypass_snapshot(self):
+        snapshots.build_snapshot('ingredients')
+
+        response = self.client.get('/api/ingredients/', {'name': 'сол'})
+
+        self.assertNotIn('ETag', response)
+        self.assertEqual(
+            [ingredient['name'] for ingredient in response.data], ['Соль'])
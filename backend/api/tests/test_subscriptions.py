@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from api.tests import AuthenticatedTestCase
+from api.views import UserModelViewSet
+from django.utils import timezone
+from recipes.models import Recipe
+from users.models import Subscription, UserModel
+
+
+class SubscriptionRecipesTests(AuthenticatedTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = cls.create_user('viewer')
+        cls.latest = {}
+        created = timezone.now()
+        for number, recipes_count in enumerate((4, 1, 0)):
+            author = cls.create_user(f'author{number}')
+            Subscription.objects.create(
+                subscriber=cls.viewer, subscribed_to=author)
+            recipe_ids = []
+            for age in range(recipes_count):
+                recipe = Recipe.objects.create(
+                    name=f'Рецепт {age}', image='recipes/image.png',
+                    text='Текст', cooking_time=10, author=author)
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    datetime_created=created - timedelta(days=age))
+                recipe_ids.append(recipe.id)
+            cls.latest[author.id] = recipe_ids
+
+    def get_recipes(self, params):
+        with self.assertNumQueries(
+                UserModelViewSet.query_budgets['subscription_get']):
+            response = self.client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, 200)
+        return {author['id']: [recipe['id'] for recipe in author['recipes']]
+                for author in response.data['results']}
+
+    def test_newest_recipes_per_author_in_one_query(self):
+        self.assertEqual(
+            self.get_recipes({'recipes_limit': 2}),
+            {author: ids[:2] for author, ids in self.latest.items()})
+
+    def test_without_limit_all_recipes_are_returned(self):
+        self.assertEqual(self.get_recipes({}), self.latest)
+
+    def test_subscribe_response_uses_limit(self):
+        author = UserModel.objects.get(username='author0')
+        Subscription.objects.filter(subscribed_to=author).delete()
+
+        response = self.client.post(
+            f'/api/users/{author.id}/subscribe/?recipes_limit=1')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([recipe['id'] for recipe in response.data['recipes']],
+                         self.latest[author.id][:1])
+
+    def test_invalid_limit_is_rejected(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 'много'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.data)
@@ -0,0 +1,75 @@
+from api.views import UserModelViewSet
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.authentication import token_cache
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TokenCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user(
+            email='user@foodgram.ru', username='user', password='password',
+            first_name='Имя', last_name='Фамилия')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def me(self):
+        return self.client.get('/api/users/me/')
+
+    def test_repeated_requests_skip_auth_query(self):
+        budget = UserModelViewSet.query_budgets['me']
+        with self.assertNumQueries(budget + 1):
+            self.me()
+
+        with self.assertNumQueries(budget):
+            response = self.me()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_logout_evicts_token(self):
+        self.me()
+
+        response = self.client.post('/api/auth/token/logout/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_user_change_evicts_token(self):
+        self.me()
+        user = UserModel.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+
+        self.assertEqual(self.me().status_code, 401)
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_zero_ttl_disables_cache(self):
+        budget = UserModelViewSet.query_budgets['me']
+        self.me()
+
+        with self.assertNumQueries(budget + 1):
+            self.me()
+
+    def test_stale_user_save_keeps_counters(self):
+        self.me()
+        UserModel.objects.filter(pk=self.user.pk).update(followers_count=3)
+
+        response = self.client.patch(
+            '/api/users/me/', {'first_name': 'Новое'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            UserModel.objects.values_list(
+                'first_name', 'followers_count').get(pk=self.user.pk),
+            ('Новое', 3))
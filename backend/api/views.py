@@ -1,20 +1,42 @@
-from django.db.models import Count, F, Sum
-from django.http import HttpResponse
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipes.constants import SHORT_LINK_MIN_LENGTH
+from foodgram_backend.metrics import InstrumentedViewMixin
+from foodgram_backend.replicas import ReplicaReadMixin
+from recipes.autocomplete import ingredient_index
+from recipes.constants import SHORT_LINK_MAX_AGE
+from recipes.export import export_recipes
 from recipes.filters import IngredientFilter, RecipeFilter
-from recipes.models import Favorites, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.models import (Favorites, FeedItem, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag,
+                            resolve_short_code, short_link_codec)
+from recipes.snapshots import snapshot_cache
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
-from sqids import Sqids
 from users.models import Subscription, UserModel
 
+from .bulk import import_recipes
+from .pagination import (FeedPagination, KeysetPagination,
+                         SubscriptionPagination)
+from .renderers import recipe_export_renderers, shopping_list_renderers
 from .serializers import (AvatarSerializer, FavoritesSerializer,
                           IngredientSerializer, RecipeCreateSerializer,
                           RecipeSerializer, ShoppingCartSerializer,
@@ -23,10 +45,81 @@ from .serializers import (AvatarSerializer, FavoritesSerializer,
                           UserSerializer)
 
 
-class UserModelViewSet(UserViewSet):
+class ViewerStateQuerysetMixin:
+    def annotate_is_subscribed(self, queryset):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()))
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(
+                subscriber=user, subscribed_to=OuterRef('pk'))))
+
+    def annotate_recipe_state(self, queryset):
+        user = self.request.user
+        queryset = queryset.prefetch_related(Prefetch(
+            'author',
+            queryset=self.annotate_is_subscribed(UserModel.objects.all())
+        ))
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()))
+        return queryset.annotate(
+            is_favorited=Exists(Favorites.objects.filter(
+                owner=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                owner=user, recipe=OuterRef('pk'))),
+        )
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None or recipes_limit == '-1':
+        return None
+    if not recipes_limit.isdigit():
+        raise ValidationError({'recipes_limit': (
+            'Должно быть неотрицательным целым числом.')})
+    return int(recipes_limit)
+
+
+def attach_latest_recipes(authors, limit):
+    if not authors:
+        return authors
+    recipes = Recipe.objects.filter(author__in=authors)
+    if limit is not None:
+        # Фильтр по оконной функции возможен только во внешнем запросе.
+        ranked = recipes.annotate(recipe_rank=Window(
+            RowNumber(),
+            partition_by=F('author_id'),
+            order_by=[F('datetime_created').desc(), F('id').desc()],
+        )).values('id', 'recipe_rank').order_by()
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) ranked WHERE recipe_rank <= %s',
+            (*params, limit)))
+    latest = defaultdict(list)
+    for recipe in recipes.order_by('-datetime_created', '-id'):
+        latest[recipe.author_id].append(recipe)
+    for author in authors:
+        author.latest_recipes = latest[author.id]
+    return authors
+
+
+class UserModelViewSet(InstrumentedViewMixin, ReplicaReadMixin,
+                       ViewerStateQuerysetMixin, UserViewSet):
     queryset = UserModel.objects.all().order_by('username')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, ]
+    query_budgets = {
+        'list': 2,
+        'retrieve': 1,
+        'me': 1,
+        'subscription_get': 3,
+    }
+
+    def get_queryset(self):
+        return self.annotate_is_subscribed(super().get_queryset())
 
     @action(detail=False, methods=['put', 'delete'],
             permission_classes=[IsAuthenticated, ], url_path='me/avatar')
@@ -38,31 +131,31 @@ class UserModelViewSet(UserViewSet):
 
             user.avatar = serializer.validated_data['avatar']
             user.save()
-            response_serializer = AvatarSerializer(
-                data={'avatar': user.avatar}
-            )
-            response_serializer.is_valid(raise_exception=True)
-
-            return Response(response_serializer.data)
+            return Response(AvatarSerializer(
+                user, context={'request': request}).data)
 
-        user.avatar.delete()
+        user.avatar = ''
         user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_subscriptions(self, user):
+        return self.annotate_is_subscribed(UserModel.objects.filter(
+            follows__subscriber=user
+        ).order_by('username'))
+
     @action(detail=False, methods=['get', ],
             permission_classes=[IsAuthenticated, ],
-            pagination_class=PageNumberPagination,
+            pagination_class=SubscriptionPagination,
             url_path='subscriptions')
     def subscription_get(self, request):
 
         if request.method == 'GET':
-            subs = UserModel.objects.filter(
-                follows__subscriber=request.user
-            ).distinct().order_by('username').annotate(
-                recipes_count=Count('recipes'))
+            recipes_limit = get_recipes_limit(request)
+            subs = self.get_subscriptions(request.user)
 
             paginator = self.pagination_class()
-            page = paginator.paginate_queryset(subs, request)
+            page = attach_latest_recipes(
+                paginator.paginate_queryset(subs, request), recipes_limit)
 
             serializer = SubscriptionSerializer(
                 instance=page,
@@ -76,6 +169,7 @@ class UserModelViewSet(UserViewSet):
             permission_classes=[IsAuthenticated, ],
             pagination_class=PageNumberPagination,
             url_path='subscribe')
+    @transaction.atomic
     def subscription(self, request, id):
         if Subscription.objects.filter(
             subscriber=self.request.user,
@@ -93,7 +187,9 @@ class UserModelViewSet(UserViewSet):
         serializer.save()
 
         serializer_to_return = SubscriptionSerializer(
-            instance=get_object_or_404(UserModel, pk=id),
+            instance=attach_latest_recipes(
+                [get_object_or_404(UserModel, pk=id)],
+                get_recipes_limit(request))[0],
             context={'request': request}
         )
 
@@ -103,6 +199,7 @@ class UserModelViewSet(UserViewSet):
         )
 
     @subscription.mapping.delete
+    @transaction.atomic
     def subscription_delete(self, request, id):
         if not Subscription.objects.filter(
             subscriber=self.request.user,
@@ -117,13 +214,59 @@ class UserModelViewSet(UserViewSet):
         )
 
 
-class BaseDataViewset(viewsets.ReadOnlyModelViewSet):
+def accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        encoding, *params = (part.strip() for part in item.split(';'))
+        if not any(param.replace(' ', '').rstrip('0') in ('q=', 'q=0.')
+                   for param in params):
+            accepted.add(encoding)
+    return accepted
+
+
+def snapshot_response(request, name):
+    snapshot = snapshot_cache.get(name)
+    if snapshot is None:
+        return None
+    version, contents = snapshot
+    etag = f'"{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        accepted = accepted_encodings(request)
+        encoding = next((encoding for encoding in ('br', 'gzip')
+                         if encoding in contents and encoding in accepted),
+                        'identity')
+        response = HttpResponse(
+            contents[encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, public=True,
+                        max_age=settings.SNAPSHOT_MAX_AGE)
+    return response
+
+
+class BaseDataViewset(InstrumentedViewMixin, ReplicaReadMixin,
+                      viewsets.ReadOnlyModelViewSet):
     pagination_class = None
+    snapshot_name = None
+    query_budgets = {
+        'list': 1,
+        'retrieve': 1,
+    }
+
+    def list(self, request, *args, **kwargs):
+        response = snapshot_response(request, self.snapshot_name)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return response
 
 
 class TagViewset(BaseDataViewset):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    snapshot_name = 'tags'
 
 
 class IngredientViewset(BaseDataViewset):
@@ -131,18 +274,47 @@ class IngredientViewset(BaseDataViewset):
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
-
-
-class RecipeViewset(viewsets.ModelViewSet):
+    snapshot_name = 'ingredients'
+
+    def list(self, request):
+        if not request.query_params:
+            response = snapshot_response(request, self.snapshot_name)
+            if response is not None:
+                return response
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            if not limit.isdigit():
+                raise ValidationError(
+                    {'limit': 'Должно быть неотрицательным целым числом.'})
+            limit = int(limit)
+        return Response(ingredient_index.get().search(
+            request.query_params.get('name', ''), limit))
+
+
+class RecipeViewset(InstrumentedViewMixin, ReplicaReadMixin,
+                    ViewerStateQuerysetMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
 
-    queryset = Recipe.objects.all().select_related('author').prefetch_related(
-        'ingredients', 'tags').order_by('-datetime_created')
+    queryset = Recipe.objects.all().prefetch_related(
+        'recipe_ingredients__ingredient', 'tags'
+    ).order_by('-datetime_created', '-id')
 
     permission_classes = [IsAuthenticatedOrReadOnly, ]
+    pagination_class = KeysetPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-
+    query_budgets = {
+        'list': 6,
+        'retrieve': 5,
+        'short_link': 1,
+        'cart_download': 1,
+        'feed': 6,
+    }
+
+    def get_queryset(self):
+        return self.annotate_recipe_state(super().get_queryset())
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user
@@ -153,8 +325,9 @@ class RecipeViewset(viewsets.ModelViewSet):
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    @transaction.atomic
     def userlist_delete(self, request, pk, model):
-        if not model.objects.get(
+        if not model.objects.filter(
             owner=self.request.user,
             recipe=get_object_or_404(Recipe, pk=pk)
         ).delete()[0] == 1:
@@ -165,6 +338,7 @@ class RecipeViewset(viewsets.ModelViewSet):
             status=status.HTTP_204_NO_CONTENT
         )
 
+    @transaction.atomic
     def userlist_create(self, request, pk, serializer):
         serializer = serializer(
             data={'owner': self.request.user.pk, 'recipe': pk})
@@ -172,7 +346,8 @@ class RecipeViewset(viewsets.ModelViewSet):
         serializer.save()
 
         recipe_serializer = ShortRecipeSerializer(
-            instance=Recipe.objects.get(pk=pk))
+            instance=Recipe.objects.get(pk=pk),
+            context=self.get_serializer_context())
 
         return Response(
             recipe_serializer.data,
@@ -193,20 +368,73 @@ class RecipeViewset(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    def get_shopping_list(self, user):
+        return ShoppingListItem.objects.filter(owner=user).values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+            amount=F('total_amount')
+        ).order_by('name')
+
+    @action(detail=False, methods=['get', ],
+            permission_classes=[IsAdminUser, ],
+            renderer_classes=recipe_export_renderers(),
+            url_path='export')
+    def export(self, request):
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(export_recipes()),
+            content_type=renderer.content_type()
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"')
+        return response
+
+    @action(detail=False, methods=['post', ],
+            permission_classes=[IsAuthenticated, ], url_path='bulk')
+    def bulk_import(self, request):
+        # Тело читается построчно, результаты отдаются по мере импорта.
+        results = import_recipes(request._request, request.user)
+        return StreamingHttpResponse(
+            (json.dumps(result, ensure_ascii=False) + '\n'
+             for result in results),
+            content_type='application/x-ndjson'
+        )
+
+    @action(detail=False, methods=['get', ],
+            permission_classes=[IsAuthenticated, ], url_path='feed')
+    def feed(self, request):
+        user = request.user
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_sources([
+            FeedItem.objects.filter(owner=user),
+            # Рецепты популярных авторов не рассылаются по лентам.
+            Recipe.objects.filter(
+                author__follows__subscriber=user,
+                author__feed_on_read=True
+            ).annotate(recipe_id=F('id')),
+        ], request)
+        recipes = {
+            recipe.id: recipe for recipe in self.annotate_recipe_state(
+                self.queryset.filter(id__in=recipe_ids))
+        }
+        serializer = RecipeSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get', ],
             permission_classes=[IsAuthenticated, ],
+            renderer_classes=shopping_list_renderers(),
             url_path='download_shopping_cart')
     def cart_download(self, request):
-        cart_q = ShoppingCart.objects.values(
-            ing_name=F('recipe__ingredients__name'),
-            ing_unit=F('recipe__ingredients__measurement_unit')).annotate(
-            ing_amount=Sum(F('recipe__recipe_ingredients__amount'))
-        ).order_by('ing_name')
-        response_string = ''
-        for ing in cart_q:
-            response_string += (f'{ing["ing_name"]} - {ing["ing_amount"]}'
-                                f' {ing["ing_unit"]}' + '\n')
-        response = HttpResponse(response_string, content_type='text/plain')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(
+                self.get_shopping_list(request.user).iterator()),
+            content_type=renderer.content_type()
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"')
         return response
 
     @action(detail=True, methods=['post', ],
@@ -228,14 +456,26 @@ class RecipeViewset(viewsets.ModelViewSet):
         return self.userlist_delete(request, pk, Favorites)
 
 
-def redirect_short_link(request, code):
-    sqids = Sqids(
-        min_length=SHORT_LINK_MIN_LENGTH,
-    )
-    decoded_ids = sqids.decode(code)
-    if not decoded_ids:
+REDIRECT_SHORT_LINK_QUERY_BUDGET = 1
+
+
+def short_link_target(code):
+    decoded_ids = short_link_codec.decode(code)
+    if not decoded_ids or short_link_codec.encode(decoded_ids) != code:
+        return None
+    try:
+        return resolve_short_code(code)
+    except Recipe.DoesNotExist:
+        return None
+
+
+def short_link_response(recipe_id):
+    if recipe_id is None:
         return redirect('/')
-    recipe_id = decoded_ids[0]
-    if Recipe.objects.filter(id=recipe_id).exists():
-        return redirect(f'/recipes/{recipe_id}')
-    return redirect('/')
+    response = redirect(f'/recipes/{recipe_id}')
+    patch_cache_control(response, public=True, max_age=SHORT_LINK_MAX_AGE)
+    return response
+
+
+def redirect_short_link(request, code):
+    return short_link_response(short_link_target(code))
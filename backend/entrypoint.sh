@@ -0,0 +1,13 @@
+#!/bin/sh
+set -e
+
+# Статика собирается при сборке образа; в общий том она копируется,
+# только если изменился её хеш.
+if ! cmp -s /app/collected_static/.sha256 /backend_static/static/.sha256; then
+    rm -rf /backend_static/static.new
+    cp -r /app/collected_static /backend_static/static.new
+    rm -rf /backend_static/static
+    mv /backend_static/static.new /backend_static/static
+fi
+
+exec gunicorn --config gunicorn.conf.py
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from foodgram_backend.handlers import StreamingASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+# То же, что get_asgi_application(), но с обработчиком, который готовит
+# тело потоковых ответов вне цикла событий.
+django.setup(set_prefix=False)
+
+application = StreamingASGIHandler()
@@ -0,0 +1,26 @@
+class HealthCheckMixin:
+    # CONN_HEALTH_CHECKS из Django 4.1: постоянное соединение проверяется
+    # один раз за запрос и только при первом обращении к нему, поэтому
+    # запрос не платит за проверку баз, которые не использует.
+    health_check_done = False
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or self.health_check_done
+                or not self.settings_dict.get('CONN_HEALTH_CHECKS')
+                or self.in_atomic_block):
+            return
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,23 @@
+# Настройки только для замеров benchmark_api: каждый запрос к базе
+# задерживается на BENCHMARK_DB_LATENCY миллисекунд, как при удалённой базе.
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+from .settings import *  # noqa: F401,F403
+
+BENCHMARK_DB_LATENCY = int(os.getenv('BENCHMARK_DB_LATENCY', 20))
+
+
+def delay_query(execute, sql, params, many, context):
+    time.sleep(BENCHMARK_DB_LATENCY / 1000)
+    return execute(sql, params, many, context)
+
+
+def inject_db_latency(connection, **kwargs):
+    if delay_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(delay_query)
+
+
+connection_created.connect(inject_db_latency)
@@ -0,0 +1,43 @@
+import logging
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import get_resolver, reverse
+from foodgram_backend.metrics import registry
+from recipes.autocomplete import ingredient_index
+from recipes.snapshots import SNAPSHOTS, build_snapshots, snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_if_needed():
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if not plan:
+        return False
+    call_command('migrate', interactive=False)
+    return True
+
+
+def warm_up():
+    if any(snapshot_cache.get(name) is None for name in SNAPSHOTS):
+        build_snapshots()
+    for name in SNAPSHOTS:
+        snapshot_cache.get(name)
+    ingredient_index.get()
+    get_resolver().resolve('/api/recipes/')
+    reverse('api:recipe-list')
+
+
+def prepare_server():
+    # Выполняется в мастере gunicorn до форка воркеров: они получают
+    # прогретые данные, а соединения с базой открывают сами.
+    registry.clear_shared()
+    try:
+        migrated = migrate_if_needed()
+        warm_up()
+    finally:
+        connections.close_all()
+    logger.info('Сервер подготовлен, миграции %s.',
+                'применены' if migrated else 'не требуются')
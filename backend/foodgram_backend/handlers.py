@@ -0,0 +1,45 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+
+def next_chunk(chunks):
+    return next(chunks, None)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    # Django 3.2 перебирает тело потокового ответа прямо в цикле событий,
+    # а выгрузки, список покупок и импорт обращаются к базе из генераторов.
+    # Каждый кусок готовится в потоке thread_sensitive, где выполнялось
+    # представление, а между кусками поток свободен.
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        chunks = iter(response)
+        read = sync_to_async(next_chunk, thread_sensitive=True)
+        try:
+            while True:
+                part = await read(chunks)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
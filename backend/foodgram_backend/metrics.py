@@ -0,0 +1,323 @@
+import asyncio
+import glob
+import ipaddress
+import json
+import math
+import os
+import threading
+from collections import deque
+from contextvars import ContextVar
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.decorators import sync_and_async_middleware
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Как часто воркер сбрасывает свои выборки в общий каталог.
+FLUSH_INTERVAL = 1
+METRICS = {
+    'request_duration_seconds': 'Время обработки запроса.',
+    'db_queries': 'Число запросов к базе.',
+    'db_duration_seconds': 'Время запросов к базе.',
+    'serialize_duration_seconds':
+        'Время представления и сериализаторов без запросов к базе.',
+    'render_duration_seconds': 'Время рендеринга ответа.',
+    'response_bytes': 'Размер тела ответа.',
+}
+
+request_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.route = None
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.view_started = None
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.1f}',
+            f'render;dur={self.render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+class Summary:
+    def __init__(self, samples=None):
+        if samples is None:
+            samples = deque(maxlen=settings.METRICS_SAMPLES)
+        self.samples = samples
+        self.count = 0
+        self.total = 0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def add(self, samples, count, total):
+        self.samples.extend(samples)
+        self.count += count
+        self.total += total
+
+    def quantile(self, q):
+        ordered = sorted(self.samples)
+        return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+class MetricsRegistry:
+    # Выборки живут в памяти процесса. С METRICS_DIR каждый воркер gunicorn
+    # раз в FLUSH_INTERVAL пишет их в свой файл, а /metrics складывает
+    # файлы всех воркеров, как multiprocess-режим клиента Prometheus.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.flushed = 0
+
+    def observe(self, route, method, values):
+        with self.lock:
+            for name, value in values.items():
+                key = (name, route, method)
+                if key not in self.series:
+                    self.series[key] = Summary()
+                self.series[key].observe(value)
+            due = monotonic() - self.flushed >= FLUSH_INTERVAL
+        if settings.METRICS_DIR and due:
+            self.flush()
+
+    def path(self):
+        return os.path.join(settings.METRICS_DIR, f'worker-{os.getpid()}.json')
+
+    def flush(self):
+        with self.lock:
+            self.flushed = monotonic()
+            data = [
+                [name, route, method, list(summary.samples), summary.count,
+                 summary.total]
+                for (name, route, method), summary in self.series.items()
+            ]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = self.path()
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(data, file)
+        # Читатель видит либо старый файл, либо новый целиком.
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        series = {}
+        if not settings.METRICS_DIR:
+            with self.lock:
+                for key, summary in self.series.items():
+                    series[key] = Summary([])
+                    series[key].add(
+                        summary.samples, summary.count, summary.total)
+            return series
+        self.flush()
+        pattern = os.path.join(settings.METRICS_DIR, 'worker-*.json')
+        for path in glob.glob(pattern):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, route, method, samples, count, total in data:
+                series.setdefault((name, route, method), Summary([])).add(
+                    samples, count, total)
+        return series
+
+    def render(self):
+        lines = []
+        series = self.collect()
+        for name, help_text in METRICS.items():
+            metric = f'foodgram_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} summary')
+            for (series_name, route, method), summary in sorted(
+                    series.items()):
+                if series_name != name:
+                    continue
+                labels = (f'route="{escape(route)}"'
+                          f',method="{escape(method)}"')
+                for q in QUANTILES:
+                    lines.append(
+                        f'{metric}{{{labels},quantile="{q}"}}'
+                        f' {summary.quantile(q):g}')
+                lines.append(f'{metric}_sum{{{labels}}} {summary.total:g}')
+                lines.append(f'{metric}_count{{{labels}}} {summary.count}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def clear_shared(self):
+        # Вызывается в мастере до форка: файлы прошлого запуска не нужны,
+        # а файлы завершившихся воркеров остаются, чтобы счётчики не падали.
+        if not settings.METRICS_DIR:
+            return
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, 'worker-*')):
+            os.remove(path)
+
+
+registry = MetricsRegistry()
+
+
+def escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db += perf_counter() - started
+
+
+@receiver(connection_created)
+def instrument_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    # Соединения, открытые до загрузки модуля, сигнал не застал.
+    for connection in connections.all():
+        instrument_connection(connection)
+
+
+class InstrumentedViewMixin:
+    def initial(self, request, *args, **kwargs):
+        # Под ASGI middleware работает в цикле событий, а запросы к базе
+        # идут из потока представления: его соединения и оборачиваем.
+        instrument_connections()
+        metrics = request_metrics.get()
+        if metrics is not None:
+            metrics.route = (f'{type(self).__name__}.'
+                             f'{self.action or request.method.lower()}')
+        super().initial(request, *args, **kwargs)
+        if metrics is not None:
+            metrics.view_started = (perf_counter(), metrics.db)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metrics = request_metrics.get()
+        if metrics is not None and metrics.view_started is not None:
+            started, db = metrics.view_started
+            metrics.serialize += (
+                perf_counter() - started - (metrics.db - db))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        metrics = request_metrics.get()
+        if metrics is not None and hasattr(response, 'render'):
+            started = perf_counter()
+            response.render()
+            metrics.render += perf_counter() - started
+        return response
+
+
+def observe(route, method, metrics, total, size):
+    registry.observe(route, method, {
+        'request_duration_seconds': total,
+        'db_queries': metrics.queries,
+        'db_duration_seconds': metrics.db,
+        'serialize_duration_seconds': metrics.serialize,
+        'render_duration_seconds': metrics.render,
+        'response_bytes': size,
+    })
+
+
+def count_streamed(content, route, method, metrics, started):
+    # Тело читается сервером уже после выхода из middleware: на время
+    # каждого куска сборщик снова становится текущим, а метрики запроса
+    # записываются, когда поток закончится.
+    content = iter(content)
+    size = 0
+    try:
+        while True:
+            token = request_metrics.set(metrics)
+            try:
+                chunk = next(content, None)
+            finally:
+                request_metrics.reset(token)
+            if chunk is None:
+                break
+            size += len(chunk)
+            yield chunk
+    finally:
+        observe(route, method, metrics, perf_counter() - started, size)
+
+
+def finish(request, response, metrics, started):
+    total = perf_counter() - started
+    response['Server-Timing'] = metrics.server_timing(total)
+    route = metrics.route
+    if route is None:
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+    if response.streaming:
+        response.streaming_content = count_streamed(
+            response.streaming_content, route, request.method, metrics,
+            started)
+    else:
+        observe(route, request.method, metrics, total, len(response.content))
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = perf_counter()
+            metrics = RequestMetrics()
+            token = request_metrics.set(metrics)
+            try:
+                response = await get_response(request)
+            finally:
+                request_metrics.reset(token)
+            return finish(request, response, metrics, started)
+    else:
+        def middleware(request):
+            started = perf_counter()
+            metrics = RequestMetrics()
+            token = request_metrics.set(metrics)
+            instrument_connections()
+            try:
+                response = get_response(request)
+            finally:
+                request_metrics.reset(token)
+            return finish(request, response, metrics, started)
+    return middleware
+
+
+def metrics_allowed(request):
+    if settings.METRICS_TOKEN and request.headers.get(
+            'Authorization') == f'Bearer {settings.METRICS_TOKEN}':
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network
+               for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,45 @@
+from django.contrib.auth import middleware as auth
+from django.middleware import clickjacking, common, csrf, security
+
+
+class InlineHooksMixin:
+    # Рассчитано на Django 3.2: под ASGI MiddlewareMixin.__acall__ отправляет
+    # каждый хук в единственный поток thread_sensitive, и запросы стоят в
+    # очереди к нему даже ради проверки заголовков. Хуки этих middleware не
+    # обращаются к базе и выполняются прямо в цикле событий. Сессии и
+    # сообщения могут читать и сохранять данные в базе и остаются как есть.
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineHooksMixin, security.SecurityMiddleware):
+    pass
+
+
+class CommonMiddleware(InlineHooksMixin, common.CommonMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(InlineHooksMixin, csrf.CsrfViewMiddleware):
+    # Обработчик вызывает process_view в цикле событий без перехода в
+    # поток, если метод асинхронный.
+    async def process_view(self, request, callback, callback_args,
+                           callback_kwargs):
+        return super().process_view(
+            request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(InlineHooksMixin,
+                               auth.AuthenticationMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(InlineHooksMixin,
+                              clickjacking.XFrameOptionsMiddleware):
+    pass
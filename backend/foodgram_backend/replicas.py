@@ -0,0 +1,85 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+def is_pinned(request):
+    return settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return replica_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему репликацией с основной базы.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        # Реплика выбирается одна на запрос: подсчёт, строки страницы
+        # и prefetch читаются с одинаковым отставанием.
+        alias = None
+        if (settings.DATABASE_REPLICAS and request.method in SAFE_METHODS
+                and not is_pinned(request)):
+            alias = random.choice(settings.DATABASE_REPLICAS)
+        token = replica_alias.set(alias)
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_alias.reset(token)
+        if alias is not None and response.streaming:
+            response.streaming_content = read_from(
+                alias, response.streaming_content)
+        return response
+
+
+def read_from(alias, content):
+    # Тело потокового ответа читается уже после выхода из dispatch: на
+    # время каждого куска реплика запроса снова становится текущей.
+    content = iter(content)
+    while True:
+        token = replica_alias.set(alias)
+        try:
+            chunk = next(content, None)
+        finally:
+            replica_alias.reset(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def pin_primary(request, response):
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        # Автор изменений какое-то время читает с основной базы,
+        # пока реплики не догонят её.
+        response.set_cookie(
+            settings.REPLICA_PIN_COOKIE, '1',
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True, samesite='Lax')
+    return response
+
+
+@sync_and_async_middleware
+def primary_pin_middleware(get_response):
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            return pin_primary(request, await get_response(request))
+    else:
+        def middleware(request):
+            return pin_primary(request, get_response(request))
+    return middleware
@@ -1,6 +1,8 @@
+import ipaddress
 import os
 from pathlib import Path
 
+import django
 from django.core.management.utils import get_random_secret_key
 from dotenv import load_dotenv
 
@@ -15,7 +17,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv()
 SECRET_KEY = os.getenv('SECRET_KEY', get_random_secret_key())
 
-DEBUG = os.getenv('DEBUG', True)
+DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1, localhost').split(', ')
 
@@ -40,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram_backend.replicas.primary_pin_middleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -76,18 +80,40 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram_backend.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
     } if os.getenv('USE_SQLITE', 'True').lower() == 'false'
     else {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+DATABASES['default'].update({
+    'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': os.getenv(
+        'CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+})
+
+# Реплики для чтения: хосты Postgres или файлы SQLite через запятую.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, map(str.strip, os.getenv('DB_REPLICAS', '').split(','))),
+        start=1):
+    alias = f'replica_{number}'
+    location = ('HOST' if 'postgresql' in DATABASES['default']['ENGINE']
+                else 'NAME')
+    DATABASES[alias] = {
+        **DATABASES['default'], location: replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram_backend.replicas.PrimaryReplicaRouter']
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -136,6 +162,42 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+FEED_WORKERS = int(os.getenv('FEED_WORKERS', 2))
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 10000))
+
+# Включается в asgi.py: горячие пути чтения обслуживают async-представления.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'
+ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', 8))
+# Под ASGI хуки этих middleware выполняются в цикле событий, а не по
+# очереди в единственном потоке thread_sensitive. Подмена рассчитана на
+# MiddlewareMixin из Django 3.2, на других версиях остаются исходные классы.
+INLINE_MIDDLEWARE = {
+    f'django.{path}.{name}': f'foodgram_backend.middleware.{name}'
+    for path, name in (
+        ('middleware.security', 'SecurityMiddleware'),
+        ('middleware.common', 'CommonMiddleware'),
+        ('middleware.csrf', 'CsrfViewMiddleware'),
+        ('contrib.auth.middleware', 'AuthenticationMiddleware'),
+        ('middleware.clickjacking', 'XFrameOptionsMiddleware'),
+    )
+} if django.VERSION[:2] == (3, 2) else {}
+ASYNC_MIDDLEWARE = [INLINE_MIDDLEWARE.get(name, name) for name in MIDDLEWARE]
+if ASYNC_VIEWS:
+    MIDDLEWARE = ASYNC_MIDDLEWARE
+
+SNAPSHOT_ROOT = os.getenv('SNAPSHOT_ROOT', MEDIA_ROOT / 'snapshots')
+SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', 60 * 60))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -149,9 +211,13 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Кеш токенов в памяти процесса; TOKEN_CACHE_TTL=0 его отключает.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 30))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -170,6 +236,20 @@ LOGGING = {
     },
     'root': {
         'handlers': ['console'],
-        'level': 'DEBUG',
+        'level': os.getenv('LOG_LEVEL', 'INFO'),
     },
 }
+
+# Сколько последних значений на маршрут хранится для квантилей /metrics.
+METRICS_SAMPLES = int(os.getenv('METRICS_SAMPLES', 1024))
+# Каталог, через который воркеры gunicorn делят метрики; без него /metrics
+# отдаёт метрики ответившего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# Кому отдаётся /metrics: адреса и сети через запятую или Bearer-токен.
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip())
+    for network in os.getenv(
+        'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8, ::1/128').split(',')
+    if network.strip()
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
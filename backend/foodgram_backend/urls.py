@@ -3,12 +3,16 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
+from foodgram_backend.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('s/<str:code>/', redirect_short_link, name='short-link-redirect'),
     path('api/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+if settings.ASYNC_VIEWS:
+    urlpatterns.insert(0, path('', include('api.async_urls')))
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
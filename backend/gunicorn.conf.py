@@ -0,0 +1,48 @@
+import os
+
+# Postgres по умолчанию принимает 100 соединений, часть из них оставляем
+# для миграций, админки и обслуживания.
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 100))
+DB_RESERVED_CONNECTIONS = 10
+
+
+def available_cpus():
+    # cpu_count() видит все процессоры хоста, а не доступные процессу.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers():
+    # Каждый поток воркера и пула ленты держит своё соединение с базой.
+    if os.getenv('SERVER_MODE') == 'asgi':
+        per_worker = int(os.getenv('ASYNC_DB_WORKERS', 8)) + 1
+    else:
+        per_worker = threads
+    per_worker += int(os.getenv('FEED_WORKERS', 2))
+    limit = (DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS) // per_worker
+    return max(min(available_cpus() * 2 + 1, limit), 1)
+
+
+# Воркеры складывают метрики в общий каталог, иначе /metrics отдаёт
+# метрики того воркера, который ответил.
+os.environ.setdefault('METRICS_DIR', '/tmp/foodgram-metrics')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+workers = int(os.getenv('GUNICORN_WORKERS', 0)) or default_workers()
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+if os.getenv('SERVER_MODE') == 'asgi':
+    wsgi_app = 'foodgram_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram_backend.wsgi:application'
+
+
+def on_starting(server):
+    # С preload_app Django уже загружен: миграции и прогрев идут в мастере.
+    from foodgram_backend.boot import prepare_server
+
+    prepare_server()
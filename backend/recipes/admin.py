@@ -1,44 +1,61 @@
 from django.contrib import admin
+from django.db.models import Prefetch
 
-from .models import (Favorites, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+from .models import (Favorites, Ingredient, MediaFile, Recipe,
+                     RecipeIngredient, ShoppingCart, ShoppingListItem, Tag)
+from .paginators import EstimatedCountPaginator
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
+    show_full_result_count = False
 
 
 class IngredientInline(admin.TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 1
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'display_tags',
-                    'display_ingredients', 'favorites_count')
+                    'display_ingredients', 'favorites_count',
+                    'in_carts_count')
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
-    filter_horizontal = ('tags', 'ingredients')
+    autocomplete_fields = ('author', 'tags')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     inlines = [
         IngredientInline,
     ]
 
-    @admin.display(description='Добавлений в избранное')
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related('tags', Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
 
     @admin.display(description='Тэги')
     def display_tags(self, obj):
@@ -60,8 +77,33 @@ class RecipeAdmin(admin.ModelAdmin):
 @admin.register(Favorites)
 class FavoritesAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'owner')
+    list_select_related = ('recipe', 'owner')
+    autocomplete_fields = ('recipe', 'owner')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'owner')
+    list_select_related = ('recipe', 'owner')
+    autocomplete_fields = ('recipe', 'owner')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'ingredient', 'total_amount')
+    list_select_related = ('owner', 'ingredient')
+    autocomplete_fields = ('owner', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(MediaFile)
+class MediaFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'references')
+    search_fields = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
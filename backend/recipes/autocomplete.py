@@ -0,0 +1,141 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .models import Ingredient
+
+MIN_FUZZY_QUERY_LENGTH = 4
+LONG_QUERY_LENGTH = 6
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е').strip()
+
+
+def bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def bounded_distance(first, second, max_distance):
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_char != second_char),
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class IngredientIndex:
+    def __init__(self, ingredients):
+        entries = sorted(
+            (normalize(ingredient['name']), ingredient)
+            for ingredient in ingredients
+        )
+        self.keys = [key for key, _ in entries]
+        self.ingredients = [ingredient for _, ingredient in entries]
+        self.words = []
+        self.word_positions = []
+        self.bigrams = defaultdict(list)
+        word_ids = {}
+        for position, key in enumerate(self.keys):
+            for word in {key, *key.split()}:
+                if word not in word_ids:
+                    word_ids[word] = len(self.words)
+                    self.words.append(word)
+                    self.word_positions.append([])
+                    for bigram in bigrams(word):
+                        self.bigrams[bigram].append(word_ids[word])
+                self.word_positions[word_ids[word]].append(position)
+
+    def prefix_matches(self, query):
+        position = bisect_left(self.keys, query)
+        while (position < len(self.keys)
+               and self.keys[position].startswith(query)):
+            yield position
+            position += 1
+
+    def substring_matches(self, query, seen):
+        matches = []
+        for position, key in enumerate(self.keys):
+            if position in seen or query not in key:
+                continue
+            start = key.find(query)
+            word_start = key.find(' ' + query) + 1 or None
+            matches.append((word_start is None, word_start or start,
+                            len(key), position))
+        return [position for *_, position in sorted(matches)]
+
+    def fuzzy_matches(self, query, seen):
+        max_distance = 1 if len(query) < LONG_QUERY_LENGTH else 2
+        query_bigrams = bigrams(query)
+        # Каждая правка портит не больше двух биграмм запроса.
+        min_shared = len(query_bigrams) - 2 * max_distance
+        shared = Counter()
+        for bigram in query_bigrams:
+            shared.update(self.bigrams.get(bigram, ()))
+        distances = {}
+        for word_id, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = bounded_distance(
+                query, self.words[word_id][:len(query)], max_distance)
+            if distance > max_distance:
+                continue
+            for position in self.word_positions[word_id]:
+                if position not in seen:
+                    distances[position] = min(
+                        distance, distances.get(position, distance))
+        return sorted(distances, key=lambda position: (
+            distances[position], len(self.keys[position]), position))
+
+    def search(self, query, limit=None):
+        query = normalize(query)
+        if not query:
+            return self.ingredients[:limit]
+
+        positions = list(self.prefix_matches(query))
+        matchers = [self.substring_matches]
+        if len(query) >= MIN_FUZZY_QUERY_LENGTH:
+            matchers.append(self.fuzzy_matches)
+        for matcher in matchers:
+            if limit is not None and len(positions) >= limit:
+                break
+            positions.extend(matcher(query, set(positions)))
+        return [self.ingredients[position] for position in positions[:limit]]
+
+
+class IngredientIndexHolder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.built_at = 0
+
+    def get(self):
+        index = self.index
+        if (index is None or time.monotonic() - self.built_at
+                > settings.INGREDIENT_INDEX_TTL):
+            with self.lock:
+                if self.index is index:
+                    self.index = IngredientIndex(Ingredient.objects.values(
+                        'id', 'name', 'measurement_unit').iterator())
+                    self.built_at = time.monotonic()
+                index = self.index
+        return index
+
+    def invalidate(self):
+        self.index = None
+
+
+ingredient_index = IngredientIndexHolder()
@@ -1,5 +1,8 @@
 SHORT_LINK_DOMAIN = "http://localhost"
 SHORT_LINK_MIN_LENGTH = 3
+SHORT_CODE_MAX_LENGTH = 16
+SHORT_LINK_CACHE_SIZE = 10000
+SHORT_LINK_MAX_AGE = 60 * 60
 
 USER_FIRST_NAME_MAX_LENGTH = 150
 USER_LAST_NAME_MAX_LENGTH = 150
@@ -9,5 +12,19 @@ INGREDIENT_NAME_MAX_LENGTH = 256
 RECIPE_NAME_MAX_LENGTH = 256
 MEASUREMENT_UNIT_MAX_LENGTH = 50
 
+RECIPE_SEARCH_TABLE = 'recipes_recipe_fts'
+
+IMAGE_VARIANTS = {'thumbnail': 160, 'card': 480, 'full': 1200}
+IMAGE_VARIANT_QUALITY = 80
+MEDIA_FILE_NAME_MAX_LENGTH = 255
+
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 50
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
 COOKING_TIME_MIN_VALUE = 1
 INGREDIENT_AMOUNT_MIN_VALUE = 1
@@ -0,0 +1,39 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db.models import F
+
+from .constants import EXPORT_CHUNK_SIZE
+from .models import Recipe, RecipeIngredient
+
+
+def export_recipes(chunk_size=EXPORT_CHUNK_SIZE):
+    # iterator() в Django 3.2 не выполняет prefetch_related, поэтому теги
+    # и ингредиенты подгружаются отдельно для каждой порции рецептов.
+    rows = Recipe.objects.order_by('pk').values(
+        'id', 'name', 'text', 'cooking_time', 'datetime_created', 'image',
+        'short_code', 'favorites_count', 'in_carts_count',
+        'author_id', author_username=F('author__username')
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        recipe_ids = [row['id'] for row in chunk]
+        tags = defaultdict(list)
+        for recipe_id, slug in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('tag__slug').values_list('recipe_id', 'tag__slug'):
+            tags[recipe_id].append(slug)
+        ingredients = defaultdict(list)
+        for item in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('ingredient__name').values(
+            'recipe_id', 'amount', name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        ):
+            ingredients[item.pop('recipe_id')].append(item)
+        for row in chunk:
+            row['tags'] = tags[row['id']]
+            row['ingredients'] = ingredients[row['id']]
+            yield row
@@ -0,0 +1,62 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from users.models import Subscription, UserModel
+
+from .constants import FEED_BATCH_SIZE
+from .models import FeedItem, Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.FEED_WORKERS,
+    thread_name_prefix='feed-fanout',
+)
+
+
+def fan_out(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'datetime_created').first()
+    if recipe is None:
+        return
+    followers = Subscription.objects.filter(
+        subscribed_to_id=recipe['author_id'])
+    # Для популярных авторов лента собирается при чтении; флаг не
+    # снимается, чтобы их старые рецепты не пропали из лент.
+    if followers.count() > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        UserModel.objects.filter(pk=recipe['author_id']).update(
+            feed_on_read=True)
+        return
+    if UserModel.objects.filter(
+            pk=recipe['author_id'], feed_on_read=True).exists():
+        return
+    owner_ids = followers.order_by('subscriber_id').values_list(
+        'subscriber_id', flat=True).iterator(chunk_size=FEED_BATCH_SIZE)
+    while True:
+        batch = list(islice(owner_ids, FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedItem.objects.bulk_create(
+            (FeedItem(owner_id=owner_id, recipe_id=recipe_id,
+                      datetime_created=recipe['datetime_created'])
+             for owner_id in batch),
+            ignore_conflicts=True
+        )
+
+
+def run_fan_out(recipe_id):
+    close_old_connections()
+    try:
+        fan_out(recipe_id)
+    except Exception:
+        logger.exception('Не удалось разослать рецепт %s в ленты', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_fan_out(recipe):
+    recipe_id = recipe.id
+    transaction.on_commit(lambda: executor.submit(run_fan_out, recipe_id))
@@ -1,6 +1,7 @@
 import django_filters
 
 from .models import Favorites, Ingredient, Recipe, ShoppingCart, Tag
+from .search import search_recipes
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -11,10 +12,12 @@ class RecipeFilter(django_filters.FilterSet):
     )
     is_in_shopping_cart = django_filters.CharFilter(method='filter_by_cart')
     is_favorited = django_filters.CharFilter(method='filter_by_favorite')
+    search = django_filters.CharFilter(method='filter_by_search')
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'is_in_shopping_cart', 'is_favorited', 'author']
+        fields = ['tags', 'is_in_shopping_cart', 'is_favorited', 'author',
+                  'search']
 
     def filter_by_cart(self, queryset, name, value):
         user = self.request.user
@@ -38,13 +41,16 @@ class RecipeFilter(django_filters.FilterSet):
             return queryset.filter(id__in=favorites_recipe_ids)
         return queryset.exclude(id__in=favorites_recipe_ids)
 
+    def filter_by_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
 
 class IngredientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(method='filter_by_name')
 
     def filter_by_name(self, queryset, name, value):
-        return Ingredient.objects.filter(
-            name__startswith=value
+        return queryset.filter(
+            name__istartswith=value
         )
 
     class Meta:
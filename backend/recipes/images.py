@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from .constants import IMAGE_VARIANT_QUALITY, IMAGE_VARIANTS
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT, VARIANT_EXTENSION = (
+    ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg'))
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='image-variants',
+)
+ready_lock = threading.Lock()
+ready_images = set()
+# Имена, для которых генерация уже поставлена в очередь: повторные
+# запросы отдают оригинал, не проверяя хранилище.
+pending_images = set()
+
+
+def variant_name(name, variant):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}.{VARIANT_EXTENSION}'
+
+
+def variants_ready(name):
+    if name in ready_images:
+        return True
+    # Полный размер пишется последним и означает готовность всех вариантов.
+    if default_storage.exists(variant_name(name, 'full')):
+        with ready_lock:
+            ready_images.add(name)
+        return True
+    return False
+
+
+def variant_urls(image):
+    if not image:
+        return None
+    if not schedule_variants(image):
+        return {variant: image.url for variant in IMAGE_VARIANTS}
+    return {
+        variant: default_storage.url(variant_name(image.name, variant))
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def generate_variants(name):
+    if variants_ready(name):
+        return
+    with default_storage.open(name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    if VARIANT_FORMAT == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, VARIANT_FORMAT, quality=IMAGE_VARIANT_QUALITY)
+        default_storage.save_derived(
+            variant_name(name, variant), ContentFile(buffer.getvalue()))
+    with ready_lock:
+        ready_images.add(name)
+
+
+def delete_variants(name):
+    with ready_lock:
+        ready_images.discard(name)
+        pending_images.discard(name)
+    for variant in IMAGE_VARIANTS:
+        default_storage.delete(variant_name(name, variant))
+
+
+def run_generation(name):
+    try:
+        generate_variants(name)
+    except Exception:
+        logger.exception('Не удалось подготовить варианты %s', name)
+    finally:
+        with ready_lock:
+            pending_images.discard(name)
+
+
+def queue_generation(name):
+    # Имя помечается только после коммита: при откате транзакции
+    # следующий запрос снова поставит генерацию в очередь.
+    with ready_lock:
+        if name in pending_images:
+            return
+        pending_images.add(name)
+    executor.submit(run_generation, name)
+
+
+def schedule_variants(image):
+    # Ставит генерацию в очередь, если вариантов ещё нет, в том числе
+    # для картинок, загруженных до появления вариантов.
+    if not image:
+        return False
+    name = image.name
+    if name in pending_images:
+        return False
+    if variants_ready(name):
+        return True
+    transaction.on_commit(lambda: queue_generation(name))
+    return False
@@ -0,0 +1,117 @@
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException, HTTPResponse
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает развёртывания WSGI и ASGI под параллельной нагрузкой'
+            ' на горячих путях чтения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            nargs='+',
+            help='Серверы в виде имя=адрес, например'
+                 ' wsgi=http://localhost:8000 asgi=http://localhost:8001.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Число одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Число запросов на каждый путь.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=10,
+            help='Таймаут одного запроса в секундах.',
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=0,
+            help='Пауза в миллисекундах посреди заголовков запроса:'
+                 ' имитирует медленного клиента.',
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['targets']:
+            name, separator, url = target.partition('=')
+            if not separator:
+                raise CommandError(f'Ожидается имя=адрес: {target}')
+            targets.append((name, url.rstrip('/')))
+        paths = self.get_paths()
+        self.timeout = options['timeout']
+        self.client_delay = options['client_delay'] / 1000
+
+        self.stdout.write(
+            f'{"сервер":<8} {"путь":<32} {"запр/с":>8} {"p50 мс":>8}'
+            f' {"p95 мс":>8} {"ошибок":>7}')
+        for name, url in targets:
+            for path in paths:
+                rps, latencies, errors = self.run(
+                    url + path, options['concurrency'], options['requests'])
+                self.stdout.write(
+                    f'{name:<8} {path:<32} {rps:>8.1f}'
+                    f' {self.percentile(latencies, 50):>8.1f}'
+                    f' {self.percentile(latencies, 95):>8.1f} {errors:>7}')
+
+    def get_paths(self):
+        recipe = Recipe.objects.order_by('-datetime_created').first()
+        ingredient = Ingredient.objects.first()
+        if recipe is None or ingredient is None:
+            raise CommandError('Для замеров нужны рецепт и ингредиент.')
+        return [
+            f'/s/{recipe.short_code}/',
+            '/api/tags/',
+            '/api/ingredients/?' + urlencode({'name': ingredient.name[:3]}),
+            f'/api/recipes/{recipe.id}/',
+        ]
+
+    def fetch(self, url):
+        parts = urlsplit(url)
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        started = time.perf_counter()
+        try:
+            with socket.create_connection(
+                    (parts.hostname, parts.port or 80),
+                    timeout=self.timeout) as sock:
+                sock.sendall(f'GET {target} HTTP/1.1\r\n'
+                             f'Host: {parts.netloc}\r\n'.encode())
+                if self.client_delay:
+                    time.sleep(self.client_delay)
+                sock.sendall(b'Connection: close\r\n\r\n')
+                response = HTTPResponse(sock)
+                response.begin()
+                response.read()
+        except (HTTPException, OSError):
+            return None
+        if response.status >= 400:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    def run(self, url, concurrency, requests):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(self.fetch, [url] * requests))
+        elapsed = time.perf_counter() - started
+        latencies = [result for result in results if result is not None]
+        return requests / elapsed, latencies, requests - len(latencies)
+
+    def percentile(self, latencies, percent):
+        if len(latencies) < 2:
+            return latencies[0] if latencies else 0
+        return statistics.quantiles(latencies, n=100)[percent - 1]
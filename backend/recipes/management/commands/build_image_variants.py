@@ -0,0 +1,34 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from recipes.images import generate_variants, variants_ready
+from recipes.models import Recipe
+from users.models import UserModel
+
+
+class Command(BaseCommand):
+    help = ('Готовит уменьшенные варианты для картинок рецептов и аватаров,'
+            ' загруженных до появления вариантов.')
+
+    def handle(self, *args, **options):
+        names = chain(
+            Recipe.objects.exclude(image='')
+            .values_list('image', flat=True).iterator(),
+            UserModel.objects.exclude(avatar__isnull=True)
+            .exclude(avatar='').values_list('avatar', flat=True).iterator(),
+        )
+        built = skipped = failed = 0
+        for name in names:
+            if variants_ready(name):
+                skipped += 1
+                continue
+            try:
+                generate_variants(name)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Подготовлено: {built}, уже были: {skipped},'
+            f' с ошибками: {failed}'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from recipes.snapshots import build_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Собирает сжатые снимки справочников тэгов и ингредиентов.'
+
+    def handle(self, *args, **options):
+        for name, version in build_snapshots().items():
+            self.stdout.write(self.style.SUCCESS(f'{name}: {version}'))
@@ -0,0 +1,270 @@
+import re
+
+from api.pagination import FeedPagination, KeysetPagination
+from api.views import RecipeViewset, UserModelViewSet
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.db.models.functions import Upper
+from recipes.filters import IngredientFilter
+from recipes.models import (Favorites, FeedItem, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import Subscription, UserModel
+
+PAGE_SIZE = 6
+INDEX_NAME_MAX_LENGTH = 30
+
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! VIRTUAL| USING)')
+SQLITE_ANY_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! VIRTUAL)')
+SQLITE_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (\w+(?: \w+)?)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_SORT = re.compile(r'(?:^|->\s+)(?:Incremental )?Sort\s+\(')
+
+UPPER_LOOKUPS = {'iexact', 'istartswith'}
+PATTERN_LOOKUPS = {'startswith'}
+PATTERN_OPCLASSES = {'varchar_pattern_ops', 'text_pattern_ops'}
+C_COLLATIONS = {'C', 'POSIX'}
+
+
+def index_columns(model):
+    meta = model._meta
+    columns = [(meta.pk.column,)]
+    columns += [(field.column,) for field in meta.local_fields
+                if field.db_index or field.unique]
+    columns += [tuple(meta.get_field(name).column for name in fields)
+                for fields in (*meta.unique_together, *meta.index_together)]
+    columns += [
+        tuple(meta.get_field(name.lstrip('-')).column for name in fields)
+        for fields in (
+            *(index.fields for index in meta.indexes),
+            *(constraint.fields for constraint in meta.constraints
+              if isinstance(constraint, models.UniqueConstraint)),
+        )
+    ]
+    return columns
+
+
+def split_lookup(name):
+    field, _, lookup = name.lstrip('-').partition('__')
+    return field, lookup or 'exact'
+
+
+def pattern_lookup(fields):
+    # Поиск без учёта регистра компилируется в UPPER(поле), а поиск
+    # по началу строки в LIKE: обычный индекс по столбцу им не подходит.
+    if len(fields) != 1:
+        return None
+    field, lookup = split_lookup(fields[0])
+    if lookup in UPPER_LOOKUPS:
+        return 'upper', field
+    if lookup in PATTERN_LOOKUPS:
+        return 'pattern', field
+    return None
+
+
+def is_covered(model, fields):
+    pattern = pattern_lookup(fields)
+    if pattern is not None:
+        kind, field = pattern
+        for index in model._meta.indexes:
+            if kind == 'upper' and index.expressions:
+                expression = index.expressions[0]
+                if (isinstance(expression, Upper) and getattr(
+                        expression.source_expressions[0], 'name',
+                        None) == field):
+                    return True
+            if (kind == 'pattern' and index.fields[:1] == [field]
+                    and set(index.opclasses) & PATTERN_OPCLASSES):
+                return True
+        return False
+    wanted = tuple(model._meta.get_field(split_lookup(name)[0]).column
+                   for name in fields)
+    return any(existing[:len(wanted)] == wanted
+               for existing in index_columns(model))
+
+
+def index_name(model, fields):
+    pattern = pattern_lookup(fields)
+    if pattern is not None:
+        fields = pattern if pattern[0] == 'upper' else (*pattern[1:], 'like')
+    name = '_'.join([model._meta.model_name,
+                     *(split_lookup(field)[0] for field in fields), 'idx'])
+    return name[:INDEX_NAME_MAX_LENGTH].rstrip('_')
+
+
+def index_source(model, fields):
+    name = index_name(model, fields)
+    pattern = pattern_lookup(fields)
+    if pattern is None:
+        fields = [field.partition('__')[0] for field in fields]
+        return f'models.Index(fields={fields!r}, name={name!r}),'
+    kind, field = pattern
+    if kind == 'upper':
+        return f'models.Index(Upper({field!r}), name={name!r}),'
+    return (f'models.Index(fields=[{field!r}], name={name!r},'
+            " opclasses=['varchar_pattern_ops']),")
+
+
+class Command(BaseCommand):
+    help = ('Показывает планы запросов API и предлагает индексы'
+            ' для последовательных сканирований и сортировок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого строить запросы.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(
+                f'EXPLAIN для {connection.vendor} не поддерживается.')
+        user = self.get_user(options['user'])
+        proposals = {}
+        for title, queryset, hints in self.cases(user):
+            plan = self.explain(queryset)
+            scans, sorts = self.find_problems(plan)
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(plan)
+            for table in scans:
+                self.stdout.write(self.style.WARNING(
+                    f'  ! последовательное сканирование {table}'))
+            for sort in sorts:
+                self.stdout.write(self.style.WARNING(
+                    f'  ! временная сортировка {sort}'))
+            flagged = set(scans)
+            # Полный обход индекса тоже не годится для поиска по шаблону.
+            scanned = flagged | set(SQLITE_ANY_SCAN.findall(plan))
+            for model, fields in hints:
+                table = model._meta.db_table
+                if pattern_lookup(fields) is not None:
+                    flagged_table = table in scanned
+                else:
+                    flagged_table = table in flagged
+                if ((flagged_table or sorts)
+                        and not is_covered(model, fields)):
+                    proposals.setdefault(model, {})[
+                        index_name(model, fields)] = fields
+                    self.warn_about_pattern(model, fields)
+            self.stdout.write('')
+
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('Новые индексы не нужны.'))
+            return
+        # Индекс без записи в Meta.indexes следующий makemigrations
+        # удалит, поэтому печатаем строки для модели, а миграцию
+        # создаёт makemigrations.
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Предлагаемые индексы, добавьте их в Meta.indexes'
+            ' и выполните makemigrations:'))
+        for model, indexes in proposals.items():
+            self.stdout.write(f'  {model._meta.label}:')
+            for fields in indexes.values():
+                self.stdout.write(f'    {index_source(model, fields)}')
+
+    def warn_about_pattern(self, model, fields):
+        pattern = pattern_lookup(fields)
+        if pattern is None:
+            return
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                f'  ! SQLite выполняет {fields[0]} через LIKE без индекса,'
+                ' предложенный индекс рассчитан на Postgres'))
+            return
+        if pattern[0] != 'upper' or 'istartswith' not in fields[0]:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT datcollate FROM pg_database'
+                           ' WHERE datname = current_database()')
+            collation = cursor.fetchone()[0]
+        if collation not in C_COLLATIONS:
+            # OpClass для индексов по выражениям появился в Django 4.1.
+            self.stdout.write(self.style.WARNING(
+                f'  ! при локали {collation} LIKE по UPPER({pattern[1]})'
+                ' использует индекс только с text_pattern_ops:'
+                f' RunSQL("CREATE INDEX {index_name(model, fields)} ON'
+                f' {model._meta.db_table} (UPPER({pattern[1]}::text)'
+                ' text_pattern_ops)")'))
+
+    def get_user(self, email):
+        if email:
+            try:
+                return UserModel.objects.get(email=email)
+            except UserModel.DoesNotExist:
+                raise CommandError(f'Пользователь {email} не найден.')
+        return (UserModel.objects.filter(
+            shopping_list_items__isnull=False).first()
+            or UserModel.objects.first()
+            or UserModel(id=0, username='explain'))
+
+    def view(self, viewset, action, user, params=None):
+        request = Request(APIRequestFactory().get('/', params or {}))
+        request.user = user
+        view = viewset(action=action, request=request, format_kwarg=None,
+                       args=(), kwargs={})
+        return view
+
+    def recipes(self, user, params=None):
+        view = self.view(RecipeViewset, 'list', user, params)
+        return view.filter_queryset(view.get_queryset())
+
+    def cases(self, user):
+        recipe = Recipe.objects.order_by('-datetime_created').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        recipe_order = (Recipe, ('-datetime_created', '-id'))
+
+        yield ('Рецепты: первая страница',
+               self.recipes(user)[:PAGE_SIZE], [recipe_order])
+        if recipe is not None:
+            cursor = KeysetPagination().after(
+                [recipe.datetime_created, recipe.id])
+            yield ('Рецепты: страница по курсору',
+                   self.recipes(user).order_by(*KeysetPagination.ordering)
+                   .filter(cursor)[:PAGE_SIZE], [recipe_order])
+            yield ('Рецепты: фильтр по автору',
+                   self.recipes(user, {'author': recipe.author_id})
+                   [:PAGE_SIZE], [(Recipe, ('author', '-datetime_created'))])
+            yield ('Рецепты: поиск',
+                   self.recipes(user, {'search': recipe.name.split()[0]})
+                   [:PAGE_SIZE], [])
+        if tag is not None:
+            yield ('Рецепты: фильтр по тэгу',
+                   self.recipes(user, {'tags': tag.slug})[:PAGE_SIZE],
+                   [(Tag, ('slug',)), recipe_order])
+        yield ('Рецепты: избранное',
+               self.recipes(user, {'is_favorited': '1'})[:PAGE_SIZE],
+               [(Favorites, ('owner',))])
+        yield ('Рецепты: список покупок',
+               self.recipes(user, {'is_in_shopping_cart': '1'})[:PAGE_SIZE],
+               [(ShoppingCart, ('owner',))])
+        yield ('Ингредиенты: поиск по началу названия',
+               IngredientFilter(
+                   {'name': ingredient.name[:3] if ingredient else 'сол'},
+                   queryset=Ingredient.objects.all()).qs,
+               [(Ingredient, ('name__istartswith',))])
+        yield ('Подписки',
+               self.view(UserModelViewSet, 'subscription_get', user)
+               .get_subscriptions(user)[:PAGE_SIZE],
+               [(Subscription, ('subscriber',)), (UserModel, ('username',))])
+        yield ('Лента подписок',
+               FeedItem.objects.filter(owner=user)
+               .order_by(*FeedPagination.ordering)[:PAGE_SIZE],
+               [(FeedItem, ('owner', '-datetime_created'))])
+        yield ('Скачивание списка покупок',
+               self.view(RecipeViewset, 'cart_download', user)
+               .get_shopping_list(user),
+               [(ShoppingListItem, ('owner',))])
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True)
+        return queryset.explain()
+
+    def find_problems(self, plan):
+        if connection.vendor == 'postgresql':
+            return (POSTGRES_SCAN.findall(plan),
+                    ['Sort' for line in plan.splitlines()
+                     if POSTGRES_SORT.search(line.strip())])
+        return SQLITE_SCAN.findall(plan), SQLITE_TEMP_BTREE.findall(plan)
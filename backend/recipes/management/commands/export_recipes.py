@@ -0,0 +1,40 @@
+from api.renderers import recipe_export_renderers
+from django.core.management.base import BaseCommand, CommandError
+from recipes.export import export_recipes
+
+RENDERERS = {
+    renderer.format: renderer for renderer in recipe_export_renderers()
+}
+
+
+class Command(BaseCommand):
+    help = 'Выгружает все рецепты с тегами и ингредиентами в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=sorted(RENDERERS),
+            default='ndjson',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Путь к файлу. По умолчанию выгрузка пишется в stdout.',
+        )
+
+    def handle(self, *args, **options):
+        lines = RENDERERS[options['format']]().stream(export_recipes())
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        try:
+            export_file = open(options['output'], 'w', encoding='utf-8',
+                               newline='')
+        except OSError:
+            raise CommandError(
+                f'Не удалось открыть файл: {options["output"]}')
+        with export_file:
+            export_file.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка записана в {options["output"]}.'))
@@ -0,0 +1,52 @@
+import sys
+
+from api.bulk import import_recipes
+from django.core.management.base import BaseCommand, CommandError
+from users.models import UserModel
+
+
+class Command(BaseCommand):
+    help = 'Импортирует рецепты из файла NDJSON: один рецепт на строку.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Путь к файлу NDJSON или - для чтения из stdin.',
+        )
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Email автора импортируемых рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = UserModel.objects.get(email=options['author'])
+        except UserModel.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.')
+        if options['path'] == '-':
+            self.import_file(sys.stdin.buffer, author)
+            return
+        try:
+            recipes_file = open(options['path'], 'rb')
+        except OSError:
+            raise CommandError(f'Не удалось открыть файл: {options["path"]}')
+        with recipes_file:
+            self.import_file(recipes_file, author)
+
+    def import_file(self, recipes_file, author):
+        imported = failed = 0
+        for result in import_recipes(recipes_file, author):
+            if 'error' in result:
+                raise CommandError(
+                    f'Строка {result["line"]}: {result["error"]}'
+                    f' Импортировано рецептов: {imported}.')
+            if 'errors' in result:
+                failed += 1
+                self.stderr.write(
+                    f'Строка {result["line"]}: {result["errors"]}')
+            else:
+                imported += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {imported}, с ошибками: {failed}.'))
@@ -0,0 +1,193 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient, Tag
+from recipes.snapshots import build_snapshots
+
+DATA_DIR = Path(settings.BASE_DIR).parent / 'data'
+BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 64 * 1024
+
+CATALOGS = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit'),
+                    ('name', 'measurement_unit')),
+    'tags': (Tag, ('name', 'slug'), ('slug',)),
+}
+
+
+def read_csv(path, fields):
+    with open(path, encoding='utf-8', newline='') as catalog_file:
+        for row in csv.reader(catalog_file):
+            if row:
+                yield dict(zip(fields, (value.strip() for value in row)))
+
+
+def read_json(path, fields):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    with open(path, encoding='utf-8') as catalog_file:
+        while True:
+            chunk = catalog_file.read(READ_CHUNK_SIZE)
+            buffer = buffer[position:] + chunk
+            position = 0
+            while True:
+                while (position < len(buffer)
+                       and buffer[position] in '[, \t\r\n'):
+                    position += 1
+                if position >= len(buffer) or buffer[position] == ']':
+                    break
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break
+                yield {field: str(item[field]).strip() for field in fields}
+            if not chunk:
+                return
+
+
+def unique_rows(rows, unique_fields):
+    seen = set()
+    for row in rows:
+        key = tuple(row[field] for field in unique_fields)
+        if key not in seen:
+            seen.add(key)
+            yield row
+
+
+class CSVStream(io.RawIOBase):
+    def __init__(self, rows, fields, counter):
+        self.rows = iter(rows)
+        self.fields = fields
+        self.counter = counter
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        text = io.StringIO()
+        writer = csv.writer(text)
+        while size < 0 or len(self.buffer) + text.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.counter[0] += 1
+            writer.writerow([row[field] for field in self.fields])
+        self.buffer += text.getvalue().encode()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class Command(BaseCommand):
+    help = 'Загружает каталог ингредиентов и тэгов из CSV или JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=DATA_DIR / 'ingredients.csv',
+            help='Файл ингредиентов (.csv или .json).',
+        )
+        parser.add_argument(
+            '--tags',
+            default=DATA_DIR / 'tags.csv',
+            help='Файл тэгов (.csv или .json).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Размер пачки для bulk_create.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        for catalog in CATALOGS:
+            if options[catalog]:
+                self.load(catalog, Path(options[catalog]))
+        ingredient_index.invalidate()
+        build_snapshots()
+
+    def load(self, catalog, path):
+        model, fields, unique_fields = CATALOGS[catalog]
+        readers = {'.csv': read_csv, '.json': read_json}
+        if path.suffix not in readers:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+
+        rows = unique_rows(readers[path.suffix](path, fields), unique_fields)
+        started = time.perf_counter()
+        count_before = model.objects.count()
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                read = self.copy_rows(model, fields, unique_fields, rows)
+            elif connection.vendor == 'sqlite':
+                read = self.insert_or_ignore_rows(model, fields, rows)
+            else:
+                read = self.bulk_create_rows(model, rows)
+        created = model.objects.count() - count_before
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{catalog}: прочитано {read}, добавлено {created},'
+            f' {read / elapsed if elapsed else read:.0f} строк/с'
+        ))
+
+    def bulk_create_rows(self, model, rows):
+        read = 0
+        while True:
+            batch = [model(**row) for row in islice(rows, self.batch_size)]
+            if not batch:
+                return read
+            read += len(batch)
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def insert_or_ignore_rows(self, model, fields, rows):
+        # То же, что bulk_create(ignore_conflicts=True), но без создания
+        # экземпляров моделей и компиляции запроса на каждую пачку.
+        read = 0
+        sql = (f'INSERT OR IGNORE INTO {model._meta.db_table}'
+               f' ({", ".join(fields)})'
+               f' VALUES ({", ".join(["%s"] * len(fields))})')
+        with connection.cursor() as cursor:
+            while True:
+                batch = [tuple(row[field] for field in fields)
+                         for row in islice(rows, self.batch_size)]
+                if not batch:
+                    return read
+                read += len(batch)
+                cursor.executemany(sql, batch)
+
+    def copy_rows(self, model, fields, unique_fields, rows):
+        table = model._meta.db_table
+        staging = f'{table}_staging'
+        columns = ', '.join(fields)
+        counter = [0]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {staging}'
+                f' ({", ".join(f"{field} text" for field in fields)})'
+                f' ON COMMIT DROP'
+            )
+            cursor.cursor.copy_expert(
+                f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                CSVStream(rows, fields, counter)
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns})'
+                f' SELECT {columns} FROM {staging}'
+                f' ON CONFLICT ({", ".join(unique_fields)}) DO NOTHING'
+            )
+        return counter[0]
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingListItem
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу списков покупок по корзинам пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить таблицу, ничего не изменяя.',
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            (total['owner_id'], total['ingredient_id']): total['total_amount']
+            for total in ShoppingListItem.objects.expected_totals().iterator()
+        }
+        if options['check']:
+            actual = {
+                (owner_id, ingredient_id): total_amount
+                for owner_id, ingredient_id, total_amount
+                in ShoppingListItem.objects.values_list(
+                    'owner_id', 'ingredient_id', 'total_amount').iterator()
+            }
+            mismatches = {
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key) != actual.get(key)
+            }
+            for owner_id, ingredient_id in sorted(mismatches):
+                self.stdout.write(
+                    f'Пользователь {owner_id}, ингредиент {ingredient_id}:'
+                    f' ожидается {expected.get((owner_id, ingredient_id))},'
+                    f' в таблице {actual.get((owner_id, ingredient_id))}'
+                )
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений в списках покупок: {len(mismatches)}.')
+            self.stdout.write(self.style.SUCCESS(
+                'Списки покупок совпадают с корзинами.'))
+            return
+
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                [ShoppingListItem(owner_id=owner_id,
+                                  ingredient_id=ingredient_id,
+                                  total_amount=total_amount)
+                 for (owner_id, ingredient_id), total_amount
+                 in expected.items()],
+                batch_size=BATCH_SIZE
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны: {len(expected)} позиций.'))
@@ -0,0 +1,54 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from recipes.models import COUNTERS, counted
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, списков покупок,'
+            ' рецептов и подписчиков порциями.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить счётчики, ничего не изменяя.',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for model, field, related, lookup in COUNTERS:
+            expected = counted(related, lookup)
+            pks = model.objects.order_by('pk').values_list(
+                'pk', flat=True).iterator(chunk_size=BATCH_SIZE)
+            while True:
+                batch = list(islice(pks, BATCH_SIZE))
+                if not batch:
+                    break
+                wrong = model.objects.filter(pk__in=batch).annotate(
+                    expected=expected).exclude(**{field: F('expected')})
+                if options['check']:
+                    for pk, actual, total in wrong.values_list(
+                            'pk', field, 'expected'):
+                        self.stdout.write(
+                            f'{model._meta.verbose_name} {pk}, {field}:'
+                            f' ожидается {total}, в таблице {actual}')
+                        mismatches += 1
+                    continue
+                # Пересчёт одним UPDATE, чтобы не затереть параллельные F().
+                mismatches += model.objects.filter(
+                    pk__in=list(wrong.values_list('pk', flat=True))
+                ).update(**{field: expected})
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений в счётчиках: {mismatches}.')
+            self.stdout.write(self.style.SUCCESS(
+                'Счётчики совпадают с данными.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны: исправлено {mismatches}.'))
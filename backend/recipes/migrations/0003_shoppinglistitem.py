@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-18 19:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    totals = RecipeIngredient.objects.filter(
+        recipe__shoppingcart_recipes__isnull=False
+    ).values(
+        'ingredient_id',
+        owner_id=models.F('recipe__shoppingcart_recipes__owner_id')
+    ).annotate(total_amount=models.Sum('amount')).order_by()
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(**total) for total in totals.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.IntegerField(verbose_name='Общее количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to=settings.AUTH_USER_MODEL, verbose_name='Владелец списка')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+                'default_related_name': 'shopping_list_items',
+                'unique_together': {('owner', 'ingredient')},
+            },
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from recipes.search import create_search_index, drop_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe')),
+                ('query', models.TextField(db_column='recipes_recipe_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
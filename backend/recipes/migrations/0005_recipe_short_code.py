@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 20:27
+
+from django.db import migrations, models
+from recipes.constants import SHORT_LINK_MIN_LENGTH
+from sqids import Sqids
+
+BATCH_SIZE = 1000
+
+
+def fill_short_codes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    codec = Sqids(min_length=SHORT_LINK_MIN_LENGTH)
+    batch = []
+    for recipe in Recipe.objects.only('id').iterator(chunk_size=BATCH_SIZE):
+        recipe.short_code = codec.encode([recipe.id])
+        batch.append(recipe)
+        if len(batch) == BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ['short_code'])
+            batch = []
+    Recipe.objects.bulk_update(batch, ['short_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='short_code',
+            field=models.CharField(editable=False, max_length=16, null=True, unique=True, verbose_name='Короткий код'),
+        ),
+        migrations.RunPython(fill_short_codes, migrations.RunPython.noop),
+    ]
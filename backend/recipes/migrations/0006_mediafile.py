@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 20:32
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    UserModel = apps.get_model(settings.AUTH_USER_MODEL)
+    MediaFile = apps.get_model('recipes', 'MediaFile')
+    references = Counter()
+    for model, field in ((Recipe, 'image'), (UserModel, 'avatar')):
+        references.update(model.objects.exclude(**{field: ''}).values_list(
+            field, flat=True).iterator())
+    MediaFile.objects.bulk_create(
+        (MediaFile(name=name, references=count)
+         for name, count in references.items()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_recipe_short_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')),
+            ],
+            options={
+                'verbose_name': 'Медиафайл',
+                'verbose_name_plural': 'Медиафайлы',
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
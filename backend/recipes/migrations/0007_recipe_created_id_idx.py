@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_mediafile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-datetime_created', '-id'], name='recipe_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-datetime_created'], name='recipe_author_created_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2 on 2026-10-18 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from recipes.constants import FEED_BACKFILL_SIZE
+
+
+def fill_feeds(apps, schema_editor):
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    for owner_id, author_id in Subscription.objects.values_list(
+            'subscriber_id', 'subscribed_to_id').iterator():
+        recipes = Recipe.objects.filter(author_id=author_id).order_by(
+            '-datetime_created', '-id').values_list(
+                'id', 'datetime_created')[:FEED_BACKFILL_SIZE]
+        FeedItem.objects.bulk_create(
+            FeedItem(owner_id=owner_id, recipe_id=recipe_id,
+                     datetime_created=datetime_created)
+            for recipe_id, datetime_created in recipes
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_recipe_author_created_idx'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('datetime_created', models.DateTimeField(verbose_name='Дата и время создания рецепта')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL, verbose_name='Владелец ленты')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Рецепты в лентах',
+                'default_related_name': 'feed_items',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['owner', '-datetime_created', '-recipe'], name='feed_owner_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feeditem',
+            unique_together={('owner', 'recipe')},
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-18 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorites = apps.get_model('recipes', 'Favorites')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    UserModel = apps.get_model(settings.AUTH_USER_MODEL)
+    Subscription = apps.get_model('users', 'Subscription')
+    counters = (
+        (Recipe, 'favorites_count', Favorites, 'recipe'),
+        (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+        (UserModel, 'recipes_count', Recipe, 'author'),
+        (UserModel, 'followers_count', Subscription, 'subscribed_to'),
+    )
+    for model, field, related, lookup in counters:
+        model.objects.update(**{field: Coalesce(Subquery(
+            related.objects.filter(**{lookup: OuterRef('pk')}).order_by()
+            .values(lookup).annotate(total=Count('pk')).values('total')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_feeditem'),
+        ('users', '0003_usermodel_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,25 @@
-from django.db import models
+from collections import Counter
+from functools import lru_cache, partial
+
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import (Case, Count, F, OuterRef, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Coalesce, Greatest
 from sqids import Sqids
-from users.models import UserModel
-
-from .constants import (INGREDIENT_NAME_MAX_LENGTH,
-                        MEASUREMENT_UNIT_MAX_LENGTH, RECIPE_NAME_MAX_LENGTH,
-                        SHORT_LINK_DOMAIN, SHORT_LINK_MIN_LENGTH,
-                        TAG_NAME_MAX_LENGTH)
+from users.models import Subscription, UserModel
+
+from .constants import (FEED_BACKFILL_SIZE, INGREDIENT_NAME_MAX_LENGTH,
+                        MEASUREMENT_UNIT_MAX_LENGTH,
+                        MEDIA_FILE_NAME_MAX_LENGTH, RECIPE_NAME_MAX_LENGTH,
+                        RECIPE_SEARCH_TABLE, SHORT_CODE_MAX_LENGTH,
+                        SHORT_LINK_CACHE_SIZE, SHORT_LINK_DOMAIN,
+                        SHORT_LINK_MIN_LENGTH, TAG_NAME_MAX_LENGTH)
+from .images import delete_variants
 from .validators import cooking_time_validator, ingredient_amount_validator
 
+short_link_codec = Sqids(min_length=SHORT_LINK_MIN_LENGTH)
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -86,21 +98,82 @@ class Recipe(models.Model):
         verbose_name='Ингредиенты'
     )
 
+    short_code = models.CharField(
+        max_length=SHORT_CODE_MAX_LENGTH,
+        unique=True,
+        null=True,
+        editable=False,
+        verbose_name='Короткий код'
+    )
+
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное'
+    )
+
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок'
+    )
+
+    COUNTER_FIELDS = ('favorites_count', 'in_carts_count')
+
     class Meta:
         default_related_name = 'recipes'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-datetime_created', '-id'],
+                         name='recipe_created_id_idx'),
+            models.Index(fields=['author', '-datetime_created'],
+                         name='recipe_author_created_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Счётчики меняет только update_counter: полное сохранение
+        # экземпляра, прочитанного до изменения счётчиков, их не затирает.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        if self.short_code is None:
+            self.short_code = short_link_codec.encode([self.id])
+            Recipe.objects.filter(pk=self.pk).update(
+                short_code=self.short_code)
+
     def get_short_link(self):
-        sqids = Sqids(
-            min_length=SHORT_LINK_MIN_LENGTH,
-        )
-        short_code = sqids.encode([self.id])
-        return f"{SHORT_LINK_DOMAIN}/s/{short_code}"
+        return f"{SHORT_LINK_DOMAIN}/s/{self.short_code}"
+
+
+@lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def resolve_short_code(code):
+    return Recipe.objects.values_list('id', flat=True).get(short_code=code)
+
+
+class RecipeSearchEntry(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_entry',
+    )
+    query = models.TextField(db_column=RECIPE_SEARCH_TABLE)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = RECIPE_SEARCH_TABLE
 
 
 class RecipeIngredient(models.Model):
@@ -154,10 +227,218 @@ class BaseUserRecipeList(models.Model):
 
 
 class Favorites(BaseUserRecipeList):
+    counter_field = 'favorites_count'
+
     class Meta(BaseUserRecipeList.Meta):
         verbose_name = 'Рецепт в избранном'
 
 
 class ShoppingCart(BaseUserRecipeList):
+    counter_field = 'in_carts_count'
+
     class Meta(BaseUserRecipeList.Meta):
         verbose_name = 'Рецепт в списке покупок'
+
+
+# Счётчик: модель, поле и связанная модель с полем, по которому считать.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorites, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (UserModel, 'recipes_count', Recipe, 'author'),
+    (UserModel, 'followers_count', Subscription, 'subscribed_to'),
+)
+
+
+def update_counter(model, pk, field, delta):
+    # Миграции и массовые операции сигналов не вызывают, поэтому ниже нуля
+    # не уходим, а расхождения исправляет reconcile_counters.
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def counted(related, lookup):
+    return Coalesce(Subquery(
+        related.objects.filter(**{lookup: OuterRef('pk')}).order_by()
+        .values(lookup).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class ShoppingListItemManager(models.Manager):
+    def apply_deltas(self, owner_ids, deltas):
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not owner_ids or not deltas:
+            return
+        self.bulk_create(
+            [self.model(owner_id=owner_id, ingredient_id=ingredient_id,
+                        total_amount=0)
+             for owner_id in owner_ids
+             for ingredient_id, delta in deltas.items() if delta > 0],
+            ignore_conflicts=True
+        )
+        items = self.filter(owner_id__in=owner_ids,
+                            ingredient_id__in=deltas)
+        items.update(total_amount=F('total_amount') + Case(
+            *[When(ingredient_id=ingredient_id, then=Value(delta))
+              for ingredient_id, delta in deltas.items()],
+            default=Value(0)
+        ))
+        items.filter(total_amount__lte=0).delete()
+
+    def recipe_amounts(self, recipe, sign=1):
+        return {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in RecipeIngredient.objects.filter(
+                recipe=recipe).values_list('ingredient_id', 'amount')
+        }
+
+    def add_recipe(self, owner_id, recipe):
+        self.apply_deltas([owner_id], self.recipe_amounts(recipe))
+
+    def remove_recipe(self, owner_id, recipe):
+        self.apply_deltas([owner_id], self.recipe_amounts(recipe, sign=-1))
+
+    def change_recipe(self, recipe, deltas):
+        if not any(deltas.values()):
+            return
+        self.apply_deltas(
+            list(ShoppingCart.objects.filter(recipe=recipe).values_list(
+                'owner_id', flat=True)),
+            deltas
+        )
+
+    def expected_totals(self):
+        return RecipeIngredient.objects.filter(
+            recipe__shoppingcart_recipes__isnull=False
+        ).values(
+            'ingredient_id',
+            owner_id=F('recipe__shoppingcart_recipes__owner_id')
+        ).annotate(total_amount=Sum('amount')).order_by()
+
+
+class ShoppingListItem(models.Model):
+    owner = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        verbose_name='Владелец списка',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.IntegerField(verbose_name='Общее количество')
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        unique_together = ('owner', 'ingredient')
+        default_related_name = 'shopping_list_items'
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+
+    def __str__(self):
+        return (f'{self.owner}: {self.ingredient} {self.total_amount}'
+                f' {self.ingredient.measurement_unit}')
+
+
+class MediaFileManager(models.Manager):
+    def acquire(self, name):
+        self.bulk_create([self.model(name=name)], ignore_conflicts=True)
+        self.filter(name=name).update(references=F('references') + 1)
+
+    def acquire_many(self, names):
+        counts = Counter(names)
+        if not counts:
+            return
+        self.bulk_create([self.model(name=name) for name in counts],
+                         ignore_conflicts=True)
+        self.filter(name__in=counts).update(references=F('references') + Case(
+            *[When(name=name, then=Value(count))
+              for name, count in counts.items()],
+            default=Value(0)
+        ))
+
+    def release(self, name):
+        self.filter(name=name).update(references=F('references') - 1)
+        if self.filter(name=name, references__lte=0).delete()[0]:
+            transaction.on_commit(partial(self.delete_orphan, name))
+
+    def delete_orphan(self, name):
+        # Файл могли снова загрузить, пока шла транзакция.
+        if not self.filter(name=name).exists():
+            delete_variants(name)
+            default_storage.delete(name)
+
+
+class MediaFile(models.Model):
+    name = models.CharField(
+        max_length=MEDIA_FILE_NAME_MAX_LENGTH,
+        unique=True,
+        verbose_name='Имя файла'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество ссылок'
+    )
+
+    objects = MediaFileManager()
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class FeedItemManager(models.Manager):
+    def follow(self, owner_id, author):
+        if author.feed_on_read:
+            return
+        recipes = Recipe.objects.filter(author=author).order_by(
+            '-datetime_created', '-id').values_list(
+                'id', 'datetime_created')[:FEED_BACKFILL_SIZE]
+        self.bulk_create(
+            (self.model(owner_id=owner_id, recipe_id=recipe_id,
+                        datetime_created=datetime_created)
+             for recipe_id, datetime_created in recipes),
+            ignore_conflicts=True
+        )
+
+    def unfollow(self, owner_id, author_id):
+        self.filter(owner_id=owner_id, recipe__author_id=author_id).delete()
+
+
+class FeedItem(models.Model):
+    owner = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        verbose_name='Владелец ленты',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+    )
+    # Копия даты рецепта: лента читается одним проходом по индексу.
+    datetime_created = models.DateTimeField(
+        verbose_name='Дата и время создания рецепта'
+    )
+
+    objects = FeedItemManager()
+
+    class Meta:
+        unique_together = ('owner', 'recipe')
+        default_related_name = 'feed_items'
+        indexes = [
+            models.Index(fields=['owner', '-datetime_created', '-recipe'],
+                         name='feed_owner_created_idx'),
+        ]
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Рецепты в лентах'
+
+    def __str__(self):
+        return f'{self.owner}: {self.recipe}'
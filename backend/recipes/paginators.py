@@ -0,0 +1,27 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .constants import ADMIN_ESTIMATED_COUNT_THRESHOLD
+
+
+class EstimatedCountPaginator(Paginator):
+    # Для больших таблиц без фильтров берём оценку из статистики Postgres.
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where:
+            return super().count
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return int(row[0])
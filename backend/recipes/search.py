@@ -0,0 +1,162 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe, RecipeSearchEntry
+
+SEARCH_CONFIG = 'russian'
+RECIPE_TABLE = Recipe._meta.db_table
+FTS_TABLE = RecipeSearchEntry._meta.db_table
+NAME_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+
+
+def search_terms(value):
+    return re.findall(r'\w+', value.casefold().replace('ё', 'е'))
+
+
+def fold_yo(column):
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+POSTGRES_SEARCH_SQL = [
+    f'ALTER TABLE {RECIPE_TABLE} ADD COLUMN search_vector tsvector',
+    f"""
+    CREATE FUNCTION {RECIPE_TABLE}_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}',
+                                  coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}',
+                                     coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE TRIGGER {RECIPE_TABLE}_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON {RECIPE_TABLE}
+    FOR EACH ROW EXECUTE FUNCTION {RECIPE_TABLE}_search_vector_update()
+    """,
+    f'UPDATE {RECIPE_TABLE} SET name = name',
+    f'CREATE INDEX {RECIPE_TABLE}_search_vector_gin'
+    f' ON {RECIPE_TABLE} USING gin (search_vector)',
+]
+
+POSTGRES_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {RECIPE_TABLE}_search_vector_trigger'
+    f' ON {RECIPE_TABLE}',
+    f'DROP FUNCTION IF EXISTS {RECIPE_TABLE}_search_vector_update()',
+    f'ALTER TABLE {RECIPE_TABLE} DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, {fold_yo('new.name')}, {fold_yo('new.text')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, {fold_yo('old.name')},
+                {fold_yo('old.text')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, text ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, {fold_yo('old.name')},
+                {fold_yo('old.text')});
+        INSERT INTO {FTS_TABLE} (rowid, name, text)
+        VALUES (new.id, {fold_yo('new.name')}, {fold_yo('new.text')});
+    END
+    """,
+]
+
+SQLITE_SEARCH_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, text, content='',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank)
+    VALUES ('rank', 'bm25({NAME_WEIGHT}, {TEXT_WEIGHT})')
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, text)
+    SELECT id, {fold_yo('name')}, {fold_yo('text')} FROM {RECIPE_TABLE}
+    """,
+    *SQLITE_TRIGGERS_SQL,
+]
+
+SQLITE_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def execute_for_vendor(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    execute_for_vendor(schema_editor, {
+        'postgresql': POSTGRES_SEARCH_SQL,
+        'sqlite': SQLITE_SEARCH_SQL,
+    })
+
+
+def drop_search_index(apps, schema_editor):
+    execute_for_vendor(schema_editor, {
+        'postgresql': POSTGRES_DROP_SQL,
+        'sqlite': SQLITE_DROP_SQL,
+    })
+
+
+def ensure_sqlite_triggers(connection):
+    # Миграции SQLite пересоздают таблицу рецептов и теряют триггеры.
+    with connection.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def search_recipes(queryset, value):
+    terms = search_terms(value)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT id FROM {RECIPE_TABLE}'
+            f' WHERE search_vector @@ {tsquery}', (query,)
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank_cd({RECIPE_TABLE}.search_vector, {tsquery})',
+            (query,), output_field=FloatField()
+        )).order_by('-search_rank', '-datetime_created')
+
+    if vendor == 'sqlite':
+        # Ранжирование берётся из скрытого столбца rank таблицы FTS5
+        # через JOIN, без повторного MATCH на каждую строку.
+        return queryset.filter(
+            search_entry__query=' '.join(f'"{term}"*' for term in terms)
+        ).order_by('search_entry__rank', '-datetime_created')
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(text__icontains=term)
+    return queryset.filter(condition)
@@ -0,0 +1,177 @@
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from users.models import Subscription, UserModel
+
+from .autocomplete import ingredient_index
+from .feed import schedule_fan_out
+from .images import schedule_variants
+from .models import (Favorites, FeedItem, Ingredient, MediaFile, Recipe,
+                     RecipeIngredient, ShoppingCart, ShoppingListItem, Tag,
+                     resolve_short_code, update_counter)
+from .search import FTS_TABLE, ensure_sqlite_triggers
+from .snapshots import schedule_snapshot
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+    schedule_snapshot('ingredients')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def refresh_tags_snapshot(**kwargs):
+    schedule_snapshot('tags')
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_code(**kwargs):
+    resolve_short_code.cache_clear()
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        schedule_fan_out(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def fill_feed(instance, created, **kwargs):
+    if created:
+        FeedItem.objects.follow(
+            instance.subscriber_id, instance.subscribed_to)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_feed(instance, **kwargs):
+    FeedItem.objects.unfollow(
+        instance.subscriber_id, instance.subscribed_to_id)
+
+
+# Счётчики меняются в сигналах, чтобы их не обходили каскадные удаления
+# и записи не из представлений.
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+def count_added_recipe(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, sender.counter_field, 1)
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=ShoppingCart)
+def count_removed_recipe(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, sender.counter_field, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(instance, created, **kwargs):
+    if created:
+        update_counter(UserModel, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(instance, **kwargs):
+    update_counter(UserModel, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def count_follower(instance, created, **kwargs):
+    if created:
+        update_counter(
+            UserModel, instance.subscribed_to_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def count_unfollower(instance, **kwargs):
+    update_counter(
+        UserModel, instance.subscribed_to_id, 'followers_count', -1)
+
+
+# Итоги списков покупок меняются в сигналах, чтобы их не обходили
+# каскадные удаления и правки из админки.
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.owner_id, instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    # При удалении рецепта его ингредиенты могут быть уже удалены:
+    # тогда их количества вычел remove_ingredient.
+    ShoppingListItem.objects.remove_recipe(
+        instance.owner_id, instance.recipe_id)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_ingredient(instance, **kwargs):
+    instance._previous_amount = None
+    if instance.pk is not None:
+        instance._previous_amount = RecipeIngredient.objects.filter(
+            pk=instance.pk).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def change_ingredient(instance, **kwargs):
+    deltas = defaultdict(int, {instance.ingredient_id: instance.amount})
+    previous = instance.__dict__.pop('_previous_amount', None)
+    if previous is not None:
+        deltas[previous[0]] -= previous[1]
+    ShoppingListItem.objects.change_recipe(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def remove_ingredient(instance, **kwargs):
+    ShoppingListItem.objects.change_recipe(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount})
+
+
+MEDIA_FIELDS = {Recipe: 'image', UserModel: 'avatar'}
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=UserModel)
+def remember_media(sender, instance, update_fields, **kwargs):
+    field = MEDIA_FIELDS[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values_list(
+            field, flat=True).first()
+    instance._previous_media = previous or ''
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=UserModel)
+def track_media(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_previous_media', None)
+    if previous is None:
+        return
+    image = getattr(instance, MEDIA_FIELDS[sender])
+    if image.name != previous:
+        if image:
+            MediaFile.objects.acquire(image.name)
+        if previous:
+            MediaFile.objects.release(previous)
+    schedule_variants(image)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=UserModel)
+def release_media(sender, instance, **kwargs):
+    image = getattr(instance, MEDIA_FIELDS[sender])
+    if image:
+        MediaFile.objects.release(image.name)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(app_config, using, **kwargs):
+    connection = connections[using]
+    if (app_config.name == 'recipes' and connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()):
+        ensure_sqlite_triggers(connection)
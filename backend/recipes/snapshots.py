@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Ingredient, Tag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS = {
+    'tags': (Tag, ('id', 'name', 'slug')),
+    'ingredients': (Ingredient, ('id', 'name', 'measurement_unit')),
+}
+SNAPSHOT_VERSIONS_KEPT = 2
+
+ENCODINGS = {'identity': '', 'gzip': '.gz'}
+if brotli is not None:
+    ENCODINGS['br'] = '.br'
+
+
+def compress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return data
+
+
+def snapshot_root():
+    return Path(settings.SNAPSHOT_ROOT)
+
+
+def render_snapshot(name):
+    model, fields = SNAPSHOTS[name]
+    rows = list(model.objects.values(*fields))
+    # Тот же вид, что у JSONRenderer DRF, чтобы ответы совпадали.
+    return json.dumps(
+        rows, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def replace_atomically(path, write):
+    temporary = path.with_name(f'.{os.getpid()}.{path.name}')
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def build_snapshot(name):
+    data = render_snapshot(name)
+    version = hashlib.sha256(data).hexdigest()[:16]
+    root = snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    for encoding, suffix in ENCODINGS.items():
+        versioned = root / f'{name}.{version}.json{suffix}'
+        if not versioned.exists():
+            content = compress(data, encoding)
+            replace_atomically(
+                versioned, lambda path: path.write_bytes(content))
+        # Ссылки без версии нужны шлюзу, который отдаёт файлы сам.
+        replace_atomically(root / f'{name}.json{suffix}',
+                           lambda path: path.symlink_to(versioned.name))
+    prune_versions(name, version)
+    return version
+
+
+def prune_versions(name, version):
+    current = snapshot_root() / f'{name}.{version}.json'
+    previous = sorted(
+        (path for path in snapshot_root().glob(f'{name}.*.json')
+         if path != current),
+        key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for path in previous[SNAPSHOT_VERSIONS_KEPT - 1:]:
+        for suffix in ('', '.gz', '.br'):
+            path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def build_snapshots():
+    return {name: build_snapshot(name) for name in SNAPSHOTS}
+
+
+def rebuild_snapshot(name):
+    try:
+        build_snapshot(name)
+    except Exception:
+        logger.exception('Не удалось обновить снимок %s', name)
+
+
+class SnapshotCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = {}
+
+    def get(self, name):
+        root = snapshot_root()
+        try:
+            target = os.readlink(root / f'{name}.json')
+            version = target.split('.')[1]
+            loaded = self.loaded.get(name)
+            if loaded is None or loaded[0] != version:
+                with self.lock:
+                    loaded = (version, {
+                        encoding: (root / (target + suffix)).read_bytes()
+                        for encoding, suffix in ENCODINGS.items()
+                    })
+                    self.loaded[name] = loaded
+        except OSError:
+            # Снимок ещё не собран или уже удалён новой версией.
+            return None
+        return loaded
+
+
+snapshot_cache = SnapshotCache()
+
+
+def schedule_snapshot(name):
+    # Массовые правки в одной транзакции пересобирают снимок один раз.
+    connection = transaction.get_connection()
+    if any(getattr(callback, 'snapshot', None) == name
+           for *_, callback in connection.run_on_commit):
+        return
+    callback = partial(rebuild_snapshot, name)
+    callback.snapshot = name
+    transaction.on_commit(callback)
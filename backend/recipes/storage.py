@@ -0,0 +1,41 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = digest.hexdigest()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return self._save(self.content_name(name, content), content)
+
+    def save_derived(self, name, content):
+        # Производные файлы (варианты изображений) именуются от исходного.
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        # Одинаковое содержимое даёт одинаковое имя: повторно не пишем.
+        if self.exists(name):
+            return name.replace('\\', '/')
+        directory, filename = os.path.split(name)
+        temporary = super()._save(
+            os.path.join(directory, f'.{os.getpid()}.{filename}'), content)
+        os.replace(self.path(temporary), self.path(name))
+        return name.replace('\\', '/')
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.paginators import EstimatedCountPaginator
+from users.models import UserModel
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RecipeAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = UserModel.objects.create_superuser(
+            email='admin@foodgram.ru', username='admin', password='password',
+            first_name='Имя', last_name='Фамилия')
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(30)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_recipes(self, count):
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', image='recipes/image.png',
+                text='Текст', cooking_time=10, author=self.admin)
+            recipe.tags.add(self.tag)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=5)
+                for ingredient in self.ingredients[:3])
+        return recipe
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/admin/recipes/recipe/')
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_recipes(1)
+        single = self.changelist_queries()
+        self.add_recipes(5)
+
+        self.assertEqual(self.changelist_queries(), single)
+
+    def test_change_page_does_not_list_every_ingredient(self):
+        recipe = self.add_recipes(1)
+
+        response = self.client.get(
+            f'/admin/recipes/recipe/{recipe.id}/change/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, self.ingredients[-1].name)
+
+    def test_paginator_counts_exactly_without_statistics(self):
+        self.add_recipes(2)
+
+        paginator = EstimatedCountPaginator(Recipe.objects.all(), 1)
+
+        self.assertEqual(paginator.count, 2)
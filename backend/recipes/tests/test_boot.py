@@ -0,0 +1,45 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from foodgram_backend.boot import migrate_if_needed, prepare_server
+from recipes.models import Tag
+from recipes.snapshots import SNAPSHOTS, build_snapshots, snapshot_cache
+
+
+class BootTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            SNAPSHOT_ROOT=Path(directory.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        Tag.objects.create(name='Обед', slug='lunch')
+
+    @mock.patch('foodgram_backend.boot.call_command')
+    def test_migrate_skipped_when_schema_is_current(self, call_command):
+        self.assertFalse(migrate_if_needed())
+        call_command.assert_not_called()
+
+    @mock.patch('foodgram_backend.boot.connections')
+    def test_prepare_builds_missing_snapshots(self, connections):
+        self.assertIsNone(snapshot_cache.get('tags'))
+
+        prepare_server()
+
+        for name in SNAPSHOTS:
+            self.assertIsNotNone(snapshot_cache.get(name))
+        self.assertIn(b'lunch', snapshot_cache.get('tags')[1]['identity'])
+        connections.close_all.assert_called_once()
+
+    @mock.patch('foodgram_backend.boot.connections')
+    def test_prepare_keeps_existing_snapshots(self, connections):
+        build_snapshots()
+
+        with mock.patch('foodgram_backend.boot.build_snapshots') as build:
+            prepare_server()
+
+        build.assert_not_called()
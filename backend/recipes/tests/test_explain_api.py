@@ -0,0 +1,91 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import models
+from django.db.models.functions import Upper
+from django.test import TestCase
+from recipes.management.commands import explain_api
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import UserModel
+
+
+class ExplainApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = UserModel.objects.create(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Имя', last_name='Фамилия')
+        tag = Tag.objects.create(name='Обед', slug='lunch')
+        ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        recipe = Recipe.objects.create(
+            name='Борщ украинский', image='recipes/image.png', text='Текст',
+            cooking_time=10, author=author)
+        recipe.tags.add(tag)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=5)
+
+    def explain(self, *args):
+        stdout = io.StringIO()
+        call_command('explain_api', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_every_api_query_is_explained(self):
+        output = self.explain('--user', 'chef@foodgram.ru')
+
+        for title in ('Рецепты: первая страница',
+                      'Рецепты: страница по курсору',
+                      'Рецепты: фильтр по тэгу', 'Рецепты: поиск',
+                      'Ингредиенты: поиск по началу названия', 'Подписки',
+                      'Лента подписок',
+                      'Скачивание списка покупок'):
+            self.assertIn(title, output)
+        self.assertIn('recipe_created_id_idx', output)
+        self.assertEqual(
+            output.split('makemigrations:\n')[1],
+            '  recipes.Ingredient:\n'
+            "    models.Index(Upper('name'),"
+            " name='ingredient_upper_name_idx'),\n")
+
+    def test_flagged_tables_without_index_get_proposals(self):
+        plan = '2 0 0 SCAN recipes_recipe\n3 0 0 USE TEMP B-TREE FOR ORDER BY'
+        with mock.patch.object(explain_api.Command, 'explain',
+                               return_value=plan), \
+                mock.patch.object(explain_api, 'index_columns',
+                                  return_value=[('id',)]):
+            output = self.explain()
+
+        self.assertIn('последовательное сканирование recipes_recipe', output)
+        self.assertIn('временная сортировка ORDER BY', output)
+        self.assertIn("models.Index(fields=['author', '-datetime_created'],"
+                      " name='recipe_author_datetime_created'),", output)
+        self.assertIn('ingredient_upper_name_idx', output)
+
+    def test_covered_indexes_are_detected(self):
+        self.assertTrue(explain_api.is_covered(Recipe, ('author',)))
+        self.assertTrue(explain_api.is_covered(
+            Recipe, ('-datetime_created', '-id')))
+        self.assertTrue(explain_api.is_covered(Ingredient, ('name',)))
+        self.assertFalse(explain_api.is_covered(Recipe, ('name',)))
+
+    def test_pattern_lookups_need_matching_index(self):
+        self.assertFalse(explain_api.is_covered(
+            Ingredient, ('name__istartswith',)))
+        self.assertFalse(explain_api.is_covered(
+            Ingredient, ('name__startswith',)))
+        indexes = [
+            models.Index(Upper('name'), name='ingredient_upper_name_idx'),
+            models.Index(fields=['name'], name='ingredient_name_like_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
+        with mock.patch.object(Ingredient._meta, 'indexes', indexes):
+            self.assertTrue(explain_api.is_covered(
+                Ingredient, ('name__istartswith',)))
+            self.assertTrue(explain_api.is_covered(
+                Ingredient, ('name__startswith',)))
+        self.assertEqual(
+            explain_api.index_source(Ingredient, ('name__startswith',)),
+            "models.Index(fields=['name'], name='ingredient_name_like_idx',"
+            " opclasses=['varchar_pattern_ops']),")
@@ -0,0 +1,64 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.sqlite3 import base
+from django.test import SimpleTestCase
+from foodgram_backend.backends.health import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
+
+
+class HealthCheckTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': str(Path(directory.name) / 'db.sqlite3'),
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+        })
+        self.addCleanup(self.wrapper.close)
+        self.wrapper.cursor()
+
+    def new_request(self, usable):
+        self.wrapper.close_if_unusable_or_obsolete()
+        return mock.patch.object(self.wrapper, 'is_usable',
+                                 return_value=usable)
+
+    def test_connection_is_checked_once_on_first_use(self):
+        with self.new_request(usable=True) as is_usable:
+            is_usable.assert_not_called()
+            self.wrapper.cursor()
+            self.wrapper.cursor()
+
+        is_usable.assert_called_once()
+
+    def test_broken_connection_is_replaced(self):
+        broken = self.wrapper.connection
+
+        with self.new_request(usable=False):
+            self.wrapper.cursor().execute('SELECT 1')
+
+        self.assertIsNot(self.wrapper.connection, broken)
+
+    def test_fresh_connection_is_not_checked(self):
+        self.wrapper.close()
+
+        with self.new_request(usable=False) as is_usable:
+            self.wrapper.cursor()
+
+        is_usable.assert_not_called()
+
+    def test_checks_can_be_disabled(self):
+        self.wrapper.settings_dict['CONN_HEALTH_CHECKS'] = False
+
+        with self.new_request(usable=False) as is_usable:
+            self.wrapper.cursor()
+
+        is_usable.assert_not_called()
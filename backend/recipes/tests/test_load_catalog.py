@@ -0,0 +1,62 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from recipes.management.commands import load_catalog
+from recipes.models import Ingredient, Tag
+
+
+class LoadCatalogTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(
+            SNAPSHOT_ROOT=self.directory / 'snapshots')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def load(self, **options):
+        call_command('load_catalog', stdout=io.StringIO(), **options)
+
+    def test_bundled_catalog_is_idempotent(self):
+        self.load()
+        ingredients = Ingredient.objects.count()
+        self.assertGreater(ingredients, 2000)
+        self.assertEqual(Tag.objects.count(), 4)
+        self.load()
+        self.assertEqual(Ingredient.objects.count(), ingredients)
+        self.assertEqual(Tag.objects.count(), 4)
+
+    def test_json_is_streamed_across_chunks_and_deduplicated(self):
+        items = [{'name': f'Ингредиент {number % 50}',
+                  'measurement_unit': 'г'} for number in range(100)]
+        path = self.write('ingredients.json', json.dumps(
+            items, ensure_ascii=False, indent=2))
+        with mock.patch.object(load_catalog, 'READ_CHUNK_SIZE', 7):
+            self.load(ingredients=path, tags='')
+        self.assertEqual(Ingredient.objects.count(), 50)
+
+    def test_csv_respects_existing_rows(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        path = self.write('ingredients.csv', 'соль,г\nсоль,щепотка\n')
+        self.load(ingredients=path, tags='')
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {('соль', 'г'), ('соль', 'щепотка')}
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(CommandError):
+            self.load(ingredients=self.write('ingredients.xml', ''))
@@ -0,0 +1,87 @@
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from recipes.models import MediaFile, Recipe
+from users.models import UserModel
+
+
+class MediaStorageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        variants = mock.patch('recipes.signals.schedule_variants')
+        variants.start()
+        self.addCleanup(variants.stop)
+        self.author = UserModel.objects.create(
+            email='chef@foodgram.ru', username='chef',
+            first_name='Имя', last_name='Фамилия')
+
+    def create_recipe(self, content):
+        return Recipe.objects.create(
+            name='Рецепт', text='Текст', cooking_time=10, author=self.author,
+            image=ContentFile(content, name='temp.png'))
+
+    def references(self, name):
+        return MediaFile.objects.filter(
+            name=name).values_list('references', flat=True).first()
+
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('recipes/temp.png', ContentFile(b'a'))
+        second = default_storage.save('recipes/temp.PNG', ContentFile(b'a'))
+        other = default_storage.save('recipes/temp.png', ContentFile(b'b'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('recipes/'))
+        self.assertTrue(first.endswith('.png'))
+        with default_storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'a')
+
+    def test_reupload_keeps_single_reference(self):
+        recipe = self.create_recipe(b'photo')
+        name = recipe.image.name
+
+        recipe.image = ContentFile(b'photo', name='temp.png')
+        recipe.save()
+
+        self.assertEqual(recipe.image.name, name)
+        self.assertEqual(self.references(name), 1)
+
+    def test_replaced_image_is_deleted_after_commit(self):
+        recipe = self.create_recipe(b'old')
+        old_name = recipe.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image = ContentFile(b'new', name='temp.png')
+            recipe.save()
+
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertIsNone(self.references(old_name))
+        self.assertTrue(default_storage.exists(recipe.image.name))
+        self.assertEqual(self.references(recipe.image.name), 1)
+
+    def test_shared_file_lives_until_last_reference(self):
+        first = self.create_recipe(b'shared')
+        second = self.create_recipe(b'shared')
+        self.author.avatar = first.image.name
+        self.author.save()
+        name = first.image.name
+        self.assertEqual(self.references(name), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            self.author.avatar = ''
+            self.author.save(update_fields=['avatar'])
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.references(name), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
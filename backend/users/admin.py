@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from recipes.paginators import EstimatedCountPaginator
 
 from .forms import EmailLoginForm
 from .models import Subscription, UserModel
@@ -10,18 +11,16 @@ admin.site.login_form = EmailLoginForm
 @admin.register(UserModel)
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name',
-                    'recipes_count', 'subscribers_count')
+                    'recipes_count', 'followers_count')
     search_fields = ('username', 'email', 'first_name', 'last_name')
-
-    @admin.display(description='Количество рецептов')
-    def recipes_count(self, obj):
-        return obj.recipes.count()
-
-    @admin.display(description='Количество подписчиков')
-    def subscribers_count(self, obj):
-        return obj.follows.count()
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('subscriber', 'subscribed_to')
+    list_select_related = ('subscriber', 'subscribed_to')
+    autocomplete_fields = ('subscriber', 'subscribed_to')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,64 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, user, token = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user, token
+
+    def put(self, key, user, token):
+        if settings.TOKEN_CACHE_TTL <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_TTL, user, token)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def evict(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def evict_user(self, user_id):
+        with self.lock:
+            for key in [key for key, (_, user, _) in self.entries.items()
+                        if user.pk == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.put(key, *cached)
+        user, token = cached
+        # Каждый запрос получает свою копию: представления меняют
+        # и сохраняют request.user.
+        return copy.copy(user), token
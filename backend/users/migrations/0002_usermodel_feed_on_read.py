@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='feed_on_read',
+            field=models.BooleanField(default=False, verbose_name='Лента подписчиков собирается при чтении'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_usermodel_feed_on_read'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='usermodel',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+    ]
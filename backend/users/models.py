@@ -24,8 +24,26 @@ class UserModel(AbstractUser):
         verbose_name='Аватар'
     )
 
+    feed_on_read = models.BooleanField(
+        default=False,
+        verbose_name='Лента подписчиков собирается при чтении'
+    )
+
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     USERNAME_FIELD = 'email'
+    COUNTER_FIELDS = ('recipes_count', 'followers_count')
 
     class Meta:
         ordering = ['email']
@@ -35,6 +53,18 @@ class UserModel(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        # Счётчики меняет только update_counter: сохранение устаревшего
+        # экземпляра, например закешированного при аутентификации,
+        # не должно их затирать.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     subscriber = models.ForeignKey(
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import UserModel
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(instance, **kwargs):
+    token_cache.evict(instance.key)
+
+
+@receiver([post_save, post_delete], sender=UserModel)
+def forget_user_tokens(instance, **kwargs):
+    token_cache.evict_user(instance.pk)